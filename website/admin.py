@@ -1,14 +1,91 @@
+import hashlib
+import re
 from django.contrib import admin
-from .models import Title
+from django.contrib.admin import helpers
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+from django.template.response import TemplateResponse
+from django.utils.functional import cached_property
+from .cache import catalog_generation
+from .facets import facet_values
+from .models import Title, Job
+
+# Rows handled per transaction by the bulk actions
+ADMIN_BATCH_SIZE = 500
+# Titles named on the batched delete's confirmation page
+DELETE_CONFIRMATION_SAMPLE = 10
+COUNT_CACHE_TIMEOUT = 300
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator that remembers COUNT(*) per query until the catalog changes"""
+
+    @cached_property
+    def count(self):
+        try:
+            sql, params = self.object_list.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        digest = hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+        key = f'admin-count:{catalog_generation()}:{digest}'
+        return cache.get_or_set(key, self.object_list.count, COUNT_CACHE_TIMEOUT)
+
+
+class FacetListFilter(admin.SimpleListFilter):
+    """List filter whose choices come from the TitleFacet lookup table instead of a DISTINCT scan"""
+
+    def lookups(self, request, model_admin):
+        return [(value, value) for value in self.sort(facet_values(self.parameter_name))]
+
+    def sort(self, values):
+        return sorted(values)
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.parameter_name: self.value()})
+        return queryset
+
+
+class TypeFilter(FacetListFilter):
+    title = 'type'
+    parameter_name = 'type'
+
+
+class RatingFilter(FacetListFilter):
+    title = 'rating'
+    parameter_name = 'rating'
+
+
+class ReleaseYearFilter(FacetListFilter):
+    title = 'release year'
+    parameter_name = 'release_year'
+
+    def sort(self, values):
+        return sorted(values, key=int, reverse=True)
+
+
+def fts_query(search_term):
+    """Turn admin search input into an FTS5 query: every word must match as a prefix"""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', search_term))
+
 
 @admin.register(Title)
 class TitleAdmin(admin.ModelAdmin):
     list_display = ['show_id', 'title', 'type', 'release_year', 'rating', 'date_added']
-    list_filter = ['type', 'rating', 'release_year']
+    list_filter = [TypeFilter, RatingFilter, ReleaseYearFilter]
     search_fields = ['title', 'director', 'cast', 'description']
     ordering = ['title']
     readonly_fields = ['show_id']  # Prevent editing show_id after creation
-    
+    actions = ['delete_in_batches', 'mark_as_movie', 'mark_as_tv_show']
+
+    # Counts are cached per query, and the "N total" count of the unfiltered
+    # table is not run on filtered pages
+    paginator = CachedCountPaginator
+    show_full_result_count = False
+
     fieldsets = (
         ('Basic Information', {
             'fields': ('show_id', 'type', 'title', 'release_year', 'rating')
@@ -20,7 +97,88 @@ class TitleAdmin(admin.ModelAdmin):
             'fields': ('country', 'date_added', 'listed_in')
         }),
     )
-    
+
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        return qs.select_related()
+        # The changelist only shows a few short columns; skip the large text ones
+        match = request.resolver_match
+        if match and match.url_name == 'website_title_changelist':
+            qs = qs.only('id', *self.list_display)
+        return qs
+
+    def get_search_results(self, request, queryset, search_term):
+        # Search the FTS5 index (see migration 0006) instead of LIKE over four text columns
+        if connection.vendor != 'sqlite' or not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        query = fts_query(search_term)
+        if not query:
+            return queryset.none(), False
+        matches = RawSQL('SELECT rowid FROM website_title_fts WHERE website_title_fts MATCH %s', (query,))
+        return queryset.filter(pk__in=matches), False
+
+    def get_actions(self, request):
+        # delete_selected loads every selected row for its confirmation page
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def _in_batches(self, queryset, apply):
+        """Run apply(batch queryset) on ADMIN_BATCH_SIZE rows at a time, committing each batch; returns the summed results"""
+
+        pks = list(queryset.values_list('pk', flat=True))
+        total = 0
+        for start in range(0, len(pks), ADMIN_BATCH_SIZE):
+            with transaction.atomic():
+                total += apply(Title.objects.filter(pk__in=pks[start:start + ADMIN_BATCH_SIZE]))
+        return total
+
+    @admin.action(description='Delete selected titles (in batches)', permissions=['delete'])
+    def delete_in_batches(self, request, queryset):
+        if request.POST.get('post'):
+            deleted = self._in_batches(queryset, lambda batch: batch.delete()[1].get(Title._meta.label, 0))
+            self.message_user(request, f'Deleted {deleted} titles.')
+            return None
+
+        # A confirmation page that counts the selection instead of listing every related object
+        return TemplateResponse(request, 'admin/website/title/delete_in_batches_confirmation.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Are you sure?',
+            'opts': self.model._meta,
+            'count': queryset.count(),
+            'sample': queryset.only('id', 'title')[:DELETE_CONFIRMATION_SAMPLE],
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
+
+    def _set_type(self, request, queryset, title_type):
+        def apply(batch):
+            # Saved one by one so the write hooks keep derived data in step
+            for title in batch:
+                title.type = title_type
+                title.save(update_fields=['type'])
+            return len(batch)
+
+        changed = self._in_batches(queryset.exclude(type=title_type), apply)
+        self.message_user(request, f"Marked {changed} titles as '{title_type}'.")
+
+    @admin.action(description="Mark selected titles as 'Movie'", permissions=['change'])
+    def mark_as_movie(self, request, queryset):
+        self._set_type(request, queryset, 'Movie')
+
+    @admin.action(description="Mark selected titles as 'TV Show'", permissions=['change'])
+    def mark_as_tv_show(self, request, queryset):
+        self._set_type(request, queryset, 'TV Show')
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Read-only view of the background job queue (jobs are queued through /api/jobs/)"""
+    list_display = ['id', 'kind', 'status', 'done', 'total', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status', 'kind']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
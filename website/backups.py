@@ -0,0 +1,146 @@
+"""
+Database snapshot and restore helpers used by the snapshot and restore commands.
+
+Whole-database copies go through SQLite's online backup API, which copies
+pages while other connections keep reading and writing, so the server does
+not need to stop. The Title table can also be exported to Parquet (pandas +
+pyarrow), which restores with bulk inserts instead of replaying SQL text.
+"""
+
+import sqlite3
+import time
+from django.db import connection, transaction
+from .models import Title, TitleListing
+
+# Pages copied per backup step; the lock is released for BACKUP_STEP_SLEEP between steps
+BACKUP_STEP_PAGES = 1024
+BACKUP_STEP_SLEEP = 0.01
+
+
+def _sqlite_connection():
+    if connection.vendor != 'sqlite':
+        raise ValueError('Database snapshots need the SQLite backend')
+    connection.ensure_connection()
+    return connection.connection
+
+
+def backup_to_file(path, pages=BACKUP_STEP_PAGES):
+    """Copy the live database into path; returns elapsed seconds"""
+
+    started = time.perf_counter()
+    target = sqlite3.connect(path)
+    try:
+        _sqlite_connection().backup(target, pages=pages, sleep=BACKUP_STEP_SLEEP)
+    finally:
+        target.close()
+    return time.perf_counter() - started
+
+
+def restore_from_file(path, pages=BACKUP_STEP_PAGES):
+    """Replace the live database with the contents of a backup file; returns elapsed seconds"""
+
+    started = time.perf_counter()
+    source = sqlite3.connect(path)
+    try:
+        source.backup(_sqlite_connection(), pages=pages, sleep=BACKUP_STEP_SLEEP)
+    finally:
+        source.close()
+    return time.perf_counter() - started
+
+
+def title_columns():
+    return [field.attname for field in Title._meta.concrete_fields]
+
+
+def export_titles_parquet(path):
+    """Write the Title table to a Parquet file; returns (rows, elapsed seconds)"""
+
+    import pandas as pd
+
+    started = time.perf_counter()
+    rows = Title.objects.order_by('pk').values(*title_columns())
+    frame = pd.DataFrame.from_records(rows.iterator(chunk_size=2000), columns=title_columns())
+    frame.to_parquet(path, index=False)
+    return len(frame), time.perf_counter() - started
+
+
+def read_titles_parquet(path):
+    """Read a Parquet export back into a list of Title column dicts"""
+
+    import pandas as pd
+
+    frame = pd.read_parquet(path)
+    # Exports made before a column was added restore it with the model default
+    frame = frame[[column for column in title_columns() if column in frame.columns]]
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict('records')
+
+
+def import_titles_parquet(path, batch_size=2000):
+    """Replace the Title table with a Parquet export; returns (pks, removed (pk, show_id) pairs, elapsed seconds)"""
+
+    started = time.perf_counter()
+    records = read_titles_parquet(path)
+    with transaction.atomic():
+        before = dict(Title.objects.values_list('pk', 'show_id'))
+        # Plain DELETEs: rows are replaced wholesale and the caller rebuilds the
+        # derived tables, so the per-row delete hooks are skipped on purpose
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TitleListing._meta.db_table}')
+            cursor.execute(f'DELETE FROM {Title._meta.db_table}')
+        Title.objects.bulk_create([Title(**record) for record in records], batch_size=batch_size)
+    pks = [record['id'] for record in records]
+    kept = set(pks)
+    removed = sorted((pk, show_id) for pk, show_id in before.items() if pk not in kept)
+    return pks, removed, time.perf_counter() - started
+
+
+def _sql_value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def time_dump_replay(dump_path):
+    """Seconds to rebuild a scratch database by replaying a textual SQL dump"""
+
+    with open(dump_path, encoding='utf-8') as file:
+        script = file.read()
+    started = time.perf_counter()
+    scratch = sqlite3.connect(':memory:')
+    try:
+        scratch.executescript(script)
+    finally:
+        scratch.close()
+    return time.perf_counter() - started
+
+
+def time_file_restore(backup_path):
+    """Seconds to rebuild a scratch database from a backup file with the backup API"""
+
+    started = time.perf_counter()
+    source = sqlite3.connect(backup_path)
+    scratch = sqlite3.connect(':memory:')
+    try:
+        source.backup(scratch)
+    finally:
+        source.close()
+        scratch.close()
+    return time.perf_counter() - started
+
+
+def time_parquet_load(parquet_path):
+    """Seconds to bulk-insert a Parquet export into a scratch Title table"""
+
+    started = time.perf_counter()
+    records = read_titles_parquet(parquet_path)
+    columns = title_columns()
+    scratch = sqlite3.connect(':memory:')
+    try:
+        scratch.execute(f"CREATE TABLE title ({', '.join(columns)})")
+        with scratch:
+            scratch.executemany(
+                f"INSERT INTO title VALUES ({', '.join('?' for _ in columns)})",
+                [tuple(_sql_value(record.get(column)) for column in columns) for record in records],
+            )
+    finally:
+        scratch.close()
+    return time.perf_counter() - started
@@ -0,0 +1,77 @@
+"""
+Runs several read-only API calls for /api/batch/ inside one HTTP request.
+
+Each sub-request is resolved against the URLconf and handed to the normal
+view, so filtering, pagination, caching and throttling behave exactly as for
+a direct call. Identical sub-requests are run once; the rest run in order on
+the request's own database connection. A thread pool was slower: with
+SQLite each thread has to open its own connection, which costs more than
+the sub-requests it would overlap.
+"""
+
+import logging
+from urllib.parse import urlsplit
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+
+# Read-only routes that may appear in a batch
+BATCHABLE_ROUTES = {
+    'title-list-create', 'title-detail', 'title-batch', 'movie-list', 'tv-show-list',
+    'titles-by-year', 'titles-by-genre', 'recent-titles', 'title-changes', 'title-stats',
+    'title-timeline', 'catalog-manifest', 'people-path', 'person-titles', 'person-collaborators',
+}
+
+logger = logging.getLogger(__name__)
+
+
+def _sub_request(request, path, query):
+    """A GET request for path that carries over the caller's headers, session and user"""
+
+    sub = HttpRequest()
+    sub.method = 'GET'
+    sub.path = sub.path_info = path
+    sub.META = {**request.META, 'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query}
+    sub.GET = QueryDict(query)
+    sub.COOKIES = request.COOKIES
+    for attribute in ('user', 'session'):
+        if hasattr(request, attribute):
+            setattr(sub, attribute, getattr(request, attribute))
+    return sub
+
+
+def _call(request, path, query):
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return 404, {'detail': 'Not found.'}
+    if match.url_name not in BATCHABLE_ROUTES:
+        return 400, {'detail': 'This route cannot be used in a batch.'}
+
+    sub = _sub_request(request, path, query)
+    sub.resolver_match = match
+    try:
+        response = match.func(sub, *match.args, **match.kwargs)
+    except Exception:
+        # One failing call is reported in its own entry; the rest of the batch still answers
+        logger.exception('Batched request failed: %s', path)
+        return 500, {'detail': 'A server error occurred.'}
+    return response.status_code, response.data
+
+
+def run_batch(request, urls):
+    """Run GET sub-requests for urls; returns [(status, data)] in the same order"""
+
+    # Identical sub-requests (same path and query) are run once
+    targets = {}
+    for url in urls:
+        parts = urlsplit(url)
+        targets.setdefault((parts.path, parts.query), None)
+
+    for path, query in targets:
+        targets[path, query] = _call(request, path, query)
+
+    results = []
+    for url in urls:
+        parts = urlsplit(url)
+        results.append(targets[parts.path, parts.query])
+    return results
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from .changes import latest_seq
+from .models import Title
+from .serializers import TitleDetailSerializer
+
+# Serialized TitleDetailSerializer payloads keyed by primary key.
+# The 'titles' cache is bounded, has a TTL and is shared by every worker
+# process (see CACHES in settings).
+TITLE_DETAIL_KEY = 'title-detail:{pk}'
+
+# How long followers wait on a running computation before doing it themselves,
+# and how often they look for its result
+SINGLE_FLIGHT_WAIT = 30
+SINGLE_FLIGHT_POLL = 0.05
+
+
+def _detail_cache():
+    return caches['titles']
+
+
+def _detail_key(pk):
+    return TITLE_DETAIL_KEY.format(pk=pk)
+
+
+def get_title_detail(pk):
+    """Return the detail payload for one title, reading through the cache (None if missing)"""
+
+    return get_title_details([pk]).get(int(pk))
+
+
+def get_title_details(pks):
+    """Return {pk: detail payload} for the given ids using one query for every cache miss"""
+
+    pks = [int(pk) for pk in pks]
+    cache = _detail_cache()
+    cached = cache.get_many([_detail_key(pk) for pk in pks])
+
+    payloads = {}
+    missing = []
+    for pk in pks:
+        payload = cached.get(_detail_key(pk))
+        if payload is None:
+            missing.append(pk)
+        else:
+            payloads[pk] = payload
+
+    if missing:
+        fresh = {}
+        for title in Title.objects.filter(pk__in=missing):
+            fresh[title.pk] = dict(TitleDetailSerializer(title).data)
+        cache.set_many({_detail_key(pk): payload for pk, payload in fresh.items()})
+        payloads.update(fresh)
+
+    return payloads
+
+
+def invalidate_title_details(pks):
+    """Drop cached detail payloads after the titles were written or deleted"""
+
+    keys = [_detail_key(pk) for pk in pks]
+    _detail_cache().delete_many(keys)
+    # Another worker can cache the old row until the write commits, so drop them again then
+    transaction.on_commit(lambda: _detail_cache().delete_many(keys))
+
+
+def clear_title_details():
+    """Drop every cached detail payload (used after bulk imports)"""
+
+    _detail_cache().clear()
+
+
+def catalog_generation():
+    """
+    Return the current catalog generation number.
+
+    Results computed over the whole catalog (stats, genre scans, admin counts)
+    are keyed by it. Every catalog write appends to the change feed, so its
+    newest sequence number is the generation: it lives in the database, every
+    worker process sees the same value and it cannot be evicted.
+    """
+
+    return latest_seq()
+
+
+def _flight_lock(key):
+    lock_dir = os.path.join(settings.CACHES['shared']['LOCATION'], 'flights')
+    os.makedirs(lock_dir, exist_ok=True)
+    return os.path.join(lock_dir, hashlib.md5(key.encode()).hexdigest() + '.lock')
+
+
+def _claim_flight(lock):
+    """Create the lock file for a computation; False if another process already holds it"""
+
+    for _ in range(2):
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600))
+            return True
+        except FileExistsError:
+            pass
+        # A leader that died leaves its lock behind; take over once it is older than the wait
+        try:
+            if time.time() - os.path.getmtime(lock) < SINGLE_FLIGHT_WAIT:
+                return False
+            os.remove(lock)
+        except FileNotFoundError:
+            pass
+    return False
+
+
+def single_flight(key, compute, timeout=60):
+    """
+    Return the cached result for key, computing it at most once at a time.
+
+    The result and the in-flight marker live in the 'shared' file cache, so
+    while one request in any worker process runs compute() for a key,
+    identical requests poll for its result instead of starting the same
+    computation. The marker is a lock file created with O_EXCL:
+    FileBasedCache.add() checks and writes in two steps and is not atomic
+    across processes.
+    """
+
+    shared = caches['shared']
+    result = shared.get(key)
+    if result is not None:
+        return result
+
+    lock = _flight_lock(key)
+    if _claim_flight(lock):
+        try:
+            result = compute()
+            shared.set(key, result, timeout)
+            return result
+        finally:
+            os.remove(lock)
+
+    deadline = time.monotonic() + SINGLE_FLIGHT_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(SINGLE_FLIGHT_POLL)
+        result = shared.get(key)
+        if result is not None:
+            return result
+        if not os.path.exists(lock):
+            # The leader failed, or its result was already evicted
+            break
+    return compute()
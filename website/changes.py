@@ -0,0 +1,97 @@
+from django.db.models import Max
+from .models import Title, TitleChange, TitleListing
+from .serializers import TitleListSerializer
+
+
+def record_changes(titles):
+    """Append an upsert entry for each (pk, show_id) pair"""
+
+    TitleChange.objects.bulk_create(
+        [TitleChange(title_id=pk, show_id=show_id) for pk, show_id in titles],
+        batch_size=2000,
+    )
+
+
+def record_changes_for(pks):
+    """Append upsert entries for the given title ids (used after bulk writes)"""
+
+    record_changes(Title.objects.filter(pk__in=pks).order_by('pk').values_list('pk', 'show_id'))
+
+
+def record_deletion(pk, show_id):
+    """Append a tombstone for a deleted title"""
+
+    TitleChange.objects.create(title_id=pk, show_id=show_id, deleted=True)
+
+
+def record_resync(removed, after):
+    """
+    Append an upsert for every title and a tombstone for each removed (pk, show_id) pair.
+
+    Used after a restore replaced the Title table. The entries are numbered
+    after the given sequence (the newest one before the restore), so clients
+    holding any token from before the restore are sent the restored catalog,
+    even when the restore moved the log back to an older state.
+    """
+
+    entries = [TitleChange(title_id=pk, show_id=show_id, deleted=True) for pk, show_id in removed]
+    entries += [
+        TitleChange(title_id=pk, show_id=show_id)
+        for pk, show_id in Title.objects.order_by('pk').values_list('pk', 'show_id')
+    ]
+    start = max(after, latest_seq())
+    for offset, entry in enumerate(entries, 1):
+        entry.seq = start + offset
+    TitleChange.objects.bulk_create(entries, batch_size=2000)
+
+
+def latest_seq():
+    """Sequence number of the newest change (0 for an empty log)"""
+
+    return TitleChange.objects.aggregate(seq=Max('seq'))['seq'] or 0
+
+
+def changes_since(since, limit):
+    """
+    Return (changes, next_seq, has_more) for changes after the since sequence.
+
+    Only the newest entry per title within the page is returned; upserts carry
+    the title's list payload and deletes are tombstones.
+    """
+
+    page = list(TitleChange.objects.filter(seq__gt=since).order_by('seq')[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    latest = {}
+    for change in page:
+        latest.pop(change.title_id, None)
+        latest[change.title_id] = change
+
+    upserts = [c.title_id for c in latest.values() if not c.deleted]
+    payloads = dict(TitleListing.objects.filter(pk__in=upserts).values_list('pk', 'payload'))
+    # A title whose listing is missing (not rebuilt yet) is serialized from the Title row
+    unlisted = [pk for pk in upserts if pk not in payloads]
+    if unlisted:
+        payloads.update(
+            (title.pk, dict(TitleListSerializer(title).data)) for title in Title.objects.filter(pk__in=unlisted)
+        )
+
+    changes = []
+    for change in latest.values():
+        if change.deleted:
+            changes.append({'op': 'delete', 'seq': change.seq, 'id': change.title_id, 'show_id': change.show_id})
+        elif change.title_id in payloads:
+            changes.append({'op': 'upsert', 'seq': change.seq, 'id': change.title_id, 'title': payloads[change.title_id]})
+        # An upsert for a missing title was deleted later; its tombstone follows in a later entry
+
+    next_seq = page[-1].seq if page else since
+    return changes, next_seq, has_more
+
+
+def compact_changes():
+    """Drop every entry superseded by a newer one for the same title; returns rows removed"""
+
+    newest = TitleChange.objects.values('title_id').annotate(newest=Max('seq')).values('newest')
+    deleted, _ = TitleChange.objects.exclude(seq__in=newest).delete()
+    return deleted
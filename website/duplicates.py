@@ -0,0 +1,163 @@
+"""
+Near-duplicate title detection.
+
+Titles are only compared within a block of the same release_year and type,
+which keeps the pairwise work far below O(n^2). Inside a block, every title
+becomes a vector of hashed character trigrams, L2-normalised, so one matrix
+product gives the cosine similarity of every pair in the block.
+
+The create check uses an in-process index of block matrices. The index
+follows the change feed, which every process writes to: before answering, it
+reads the changes recorded since it last looked and drops only the blocks
+those titles left or joined. A dropped block is rebuilt (one indexed query
+plus the vectorisation) the next time it is asked for.
+"""
+
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+import numpy as np
+from .changes import latest_seq
+from .models import Title, TitleChange
+
+TRIGRAM_BUCKETS = 1024
+# find_duplicates reports candidates for review; the create check only blocks close matches
+DUPLICATE_THRESHOLD = 0.8
+CREATE_DUPLICATE_THRESHOLD = 0.9
+# Past this many changed titles the block index is dropped whole rather than block by block
+MAX_CAUGHT_UP_CHANGES = 500
+
+
+def normalize_title(title):
+    """Casefolded, accents removed, punctuation turned into single spaces"""
+
+    text = ''.join(char for char in unicodedata.normalize('NFKD', title or '') if not unicodedata.combining(char))
+    return re.sub(r'[\W_]+', ' ', text.casefold()).strip()
+
+
+def trigram_matrix(titles):
+    """(len(titles), TRIGRAM_BUCKETS) float32 matrix of L2-normalised hashed trigram counts"""
+
+    matrix = np.zeros((len(titles), TRIGRAM_BUCKETS), dtype=np.float32)
+    if not titles:
+        return matrix
+    # All titles in one code-point array; trigrams that span two titles are dropped
+    normalized = [normalize_title(title) for title in titles]
+    padded = [f'  {text} ' if text else '' for text in normalized]
+    codes = np.frombuffer(''.join(padded).encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+    owner = np.repeat(np.arange(len(padded)), [len(text) for text in padded])
+    same_title = owner[:-2] == owner[2:]
+    buckets = ((codes[:-2] * 73856093) ^ (codes[1:-1] * 19349663) ^ (codes[2:] * 83492791)) % TRIGRAM_BUCKETS
+    np.add.at(matrix, (owner[:-2][same_title], buckets[same_title]), 1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def similar_pairs(matrix, threshold=DUPLICATE_THRESHOLD):
+    """[(i, j, score)] with i < j for every pair of rows at or above threshold"""
+
+    scores = matrix @ matrix.T
+    rows, cols = np.nonzero(np.triu(scores, 1) >= threshold)
+    return [(int(i), int(j), float(scores[i, j])) for i, j in zip(rows, cols)]
+
+
+def find_duplicates(threshold=DUPLICATE_THRESHOLD):
+    """
+    Ranked near-duplicate pairs across the whole catalog.
+
+    Returns (pairs, stats): pairs are (score, title a, title b) with the titles as
+    (pk, show_id, title) tuples, best first; stats counts titles, blocks and comparisons.
+    """
+
+    blocks = defaultdict(list)
+    rows = Title.objects.order_by('pk').values_list('pk', 'show_id', 'title', 'release_year', 'type')
+    for pk, show_id, title, release_year, title_type in rows.iterator(chunk_size=2000):
+        blocks[release_year, title_type].append((pk, show_id, title))
+
+    pairs = []
+    comparisons = 0
+    for members in blocks.values():
+        if len(members) < 2:
+            continue
+        comparisons += len(members) * (len(members) - 1) // 2
+        matrix = trigram_matrix([title for _, _, title in members])
+        for i, j, score in similar_pairs(matrix, threshold):
+            pairs.append((score, members[i], members[j]))
+    pairs.sort(key=lambda pair: (-pair[0], pair[1][0], pair[2][0]))
+
+    titles = sum(len(members) for members in blocks.values())
+    return pairs, {'titles': titles, 'blocks': len(blocks), 'comparisons': comparisons}
+
+
+class BlockIndex:
+    """Trigram matrices per (release_year, type), dropped when a change touches their titles"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self, seq=None):
+        with self.lock:
+            self.blocks = {}
+            self.block_of = {}  # pk -> block key, for the titles in built blocks
+            self.seq = seq  # Change-feed sequence the built blocks are current at
+
+    def catch_up(self):
+        """Drop the blocks touched by changes recorded since the last call"""
+
+        seq = latest_seq()
+        since = self.seq
+        if seq == since:
+            return
+        if since is None or seq < since:  # First use, or the log was restored
+            return self.clear(seq)
+        changed = set(TitleChange.objects.filter(seq__gt=since, seq__lte=seq).values_list('title_id', flat=True))
+        if len(changed) > MAX_CAUGHT_UP_CHANGES:
+            return self.clear(seq)
+
+        joined = set(Title.objects.filter(pk__in=changed).values_list('release_year', 'type'))
+        with self.lock:
+            left = {self.block_of[pk] for pk in changed if pk in self.block_of}
+            for key in left | joined:
+                members, _ = self.blocks.pop(key, ([], None))
+                for pk, _, _ in members:
+                    del self.block_of[pk]
+            self.seq = seq
+
+    def block(self, release_year, title_type):
+        self.catch_up()
+        key = (release_year, title_type)
+        with self.lock:
+            cached = self.blocks.get(key)
+            built_at = self.seq
+        if cached is not None:
+            return cached
+
+        members = list(Title.objects.filter(release_year=release_year, type=title_type)
+                       .order_by('pk').values_list('pk', 'show_id', 'title'))
+        matrix = trigram_matrix([title for _, _, title in members])
+        with self.lock:
+            # Not kept if another request caught up meanwhile: a change it saw may be missing here
+            if self.seq == built_at:
+                self.blocks[key] = (members, matrix)
+                self.block_of.update((pk, key) for pk, _, _ in members)
+        return members, matrix
+
+    def similar(self, title, release_year, title_type, threshold=CREATE_DUPLICATE_THRESHOLD, exclude=None):
+        """[(score, (pk, show_id, title))] for existing titles in the block, best first"""
+
+        members, matrix = self.block(release_year, title_type)
+        if not members:
+            return []
+        scores = matrix @ trigram_matrix([title])[0]
+        matches = [
+            (float(scores[i]), members[i])
+            for i in np.nonzero(scores >= threshold)[0]
+            if members[i][0] != exclude
+        ]
+        return sorted(matches, key=lambda match: (-match[0], match[1][0]))
+
+
+block_index = BlockIndex()
@@ -0,0 +1,55 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import F
+from .models import Title, TitleFacet
+
+# Title columns with a maintained list of distinct values (admin list filters)
+FACET_FIELDS = TitleFacet.FIELDS
+
+
+def facet_keys(values):
+    """Every (field, value) pair one title counts towards"""
+
+    if not values:
+        return []
+    return [
+        (field, str(values[field]))
+        for field in FACET_FIELDS
+        if values.get(field) not in (None, '')
+    ]
+
+
+def apply_facet_change(old_values, new_values):
+    """Move one title's counts from its old facet values to its new ones"""
+
+    delta = Counter(facet_keys(new_values))
+    delta.subtract(facet_keys(old_values))
+
+    with transaction.atomic():
+        for (field, value), change in delta.items():
+            if not change:
+                continue
+            updated = TitleFacet.objects.filter(field=field, value=value).update(count=F('count') + change)
+            if not updated:
+                TitleFacet.objects.create(field=field, value=value, count=change)
+
+
+def facet_values(field):
+    """Values of a field that at least one title currently has"""
+
+    return list(TitleFacet.objects.filter(field=field, count__gt=0).values_list('value', flat=True))
+
+
+def rebuild_facets():
+    """Recompute every facet count from the Title table (used after bulk imports)"""
+
+    counts = Counter()
+    for values in Title.objects.values(*FACET_FIELDS).iterator(chunk_size=2000):
+        counts.update(facet_keys(values))
+
+    with transaction.atomic():
+        TitleFacet.objects.all().delete()
+        TitleFacet.objects.bulk_create(
+            [TitleFacet(field=field, value=value, count=count) for (field, value), count in counts.items()]
+        )
+    return len(counts)
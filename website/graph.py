@@ -0,0 +1,232 @@
+"""
+Cast/crew collaboration graph stored as compact CSR arrays.
+
+build_graph() splits every title's director and cast columns once and writes
+two adjacency lists in CSR form (an indptr array of offsets plus an indices
+array): person -> titles and title -> people. The arrays are memory-mapped
+read-only, so all workers on a machine share the same pages through the OS
+page cache, and every query is a few slices of those arrays.
+"""
+
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from .models import Title
+from .parsing import split_list
+
+CURRENT_FILE = 'CURRENT'
+# Version directories are named after their build time, so they sort oldest first
+VERSION_NAME = re.compile(r'\d{20}')
+ROLE_CAST, ROLE_DIRECTOR = 0, 1
+ROLE_NAMES = {ROLE_CAST: 'cast', ROLE_DIRECTOR: 'director'}
+MAX_PATH_DEPTH = 6
+
+
+class GraphNotBuilt(Exception):
+    pass
+
+
+def graph_root():
+    return str(settings.PEOPLE_GRAPH_DIR)
+
+
+def build_graph():
+    """Build the arrays from the Title table into a new version directory; returns the version"""
+
+    people = {}
+    title_ids, edges_person, edges_title, edges_role = [], [], [], []
+    rows = Title.objects.order_by('pk').values_list('pk', 'director', 'cast')
+    for pk, director, cast in rows.iterator(chunk_size=2000):
+        title_index = len(title_ids)
+        title_ids.append(pk)
+        seen = set()
+        for role, column in ((ROLE_DIRECTOR, director), (ROLE_CAST, cast)):
+            for name in split_list(column):
+                person = people.setdefault(name, len(people))
+                if person in seen:
+                    continue
+                seen.add(person)
+                edges_person.append(person)
+                edges_title.append(title_index)
+                edges_role.append(role)
+
+    edges_person = np.asarray(edges_person, dtype=np.int32)
+    edges_title = np.asarray(edges_title, dtype=np.int32)
+    edges_role = np.asarray(edges_role, dtype=np.int8)
+
+    # person -> titles, sorted by person (stable, so titles stay in pk order)
+    by_person = np.argsort(edges_person, kind='stable')
+    person_indptr = np.zeros(len(people) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(edges_person, minlength=len(people)), out=person_indptr[1:])
+
+    # title -> people, sorted by title
+    by_title = np.argsort(edges_title, kind='stable')
+    title_indptr = np.zeros(len(title_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(edges_title, minlength=len(title_ids)), out=title_indptr[1:])
+
+    version = timezone.now().strftime('%Y%m%d%H%M%S%f')
+    directory = os.path.join(graph_root(), version)
+    os.makedirs(directory)
+    np.save(os.path.join(directory, 'title_ids.npy'), np.asarray(title_ids, dtype=np.int64))
+    np.save(os.path.join(directory, 'person_indptr.npy'), person_indptr)
+    np.save(os.path.join(directory, 'person_titles.npy'), edges_title[by_person])
+    np.save(os.path.join(directory, 'person_roles.npy'), edges_role[by_person])
+    np.save(os.path.join(directory, 'title_indptr.npy'), title_indptr)
+    np.save(os.path.join(directory, 'title_people.npy'), edges_person[by_title])
+    with open(os.path.join(directory, 'people.json'), 'w', encoding='utf-8') as file:
+        json.dump(list(people), file)
+
+    # Switch readers over, then drop versions older than the one just replaced
+    previous = published_version()
+    with tempfile.NamedTemporaryFile('w', dir=graph_root(), prefix=f'.{CURRENT_FILE}.', delete=False,
+                                     encoding='utf-8') as file:
+        file.write(version)
+    os.replace(file.name, os.path.join(graph_root(), CURRENT_FILE))
+    if previous is not None:
+        _remove_versions_before(previous)
+    return version
+
+
+def published_version():
+    """The version readers are pointed at, or None before the first build"""
+
+    try:
+        with open(os.path.join(graph_root(), CURRENT_FILE), encoding='utf-8') as file:
+            return file.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def _remove_versions_before(version):
+    """
+    Delete the version directories build_graph wrote before the given one.
+
+    The caller passes the version that was published until now, which is
+    kept: a reader in another process may have read CURRENT just before the
+    switch and still be loading it. The next build removes it. Newer
+    directories belong to this build or to one still running elsewhere.
+    """
+
+    for entry in os.listdir(graph_root()):
+        path = os.path.join(graph_root(), entry)
+        if VERSION_NAME.fullmatch(entry) and entry < version and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _expand(indptr, indices, nodes):
+    """All (source node, neighbour) pairs for the given nodes, without a Python loop"""
+
+    starts = indptr[nodes]
+    lengths = indptr[nodes + 1] - starts
+    total = int(lengths.sum())
+    if not total:
+        return np.empty(0, dtype=nodes.dtype), np.empty(0, dtype=indices.dtype)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+    return np.repeat(nodes, lengths), indices[offsets]
+
+
+class PeopleGraph:
+    """A loaded (memory-mapped) graph version"""
+
+    def __init__(self, directory):
+        def load(name):
+            return np.load(os.path.join(directory, name), mmap_mode='r')
+
+        self.title_ids = load('title_ids.npy')
+        self.person_indptr = load('person_indptr.npy')
+        self.person_titles = load('person_titles.npy')
+        self.person_roles = load('person_roles.npy')
+        self.title_indptr = load('title_indptr.npy')
+        self.title_people = load('title_people.npy')
+        with open(os.path.join(directory, 'people.json'), encoding='utf-8') as file:
+            self.names = json.load(file)
+        self.ids = {}
+        for person, name in enumerate(self.names):
+            self.ids.setdefault(name.casefold(), person)
+
+    def person_id(self, name):
+        """Look a person up by name (case-insensitive); None if unknown"""
+        return self.ids.get(name.strip().casefold())
+
+    def filmography(self, person):
+        """[(title pk, role name)] for a person"""
+        start, end = self.person_indptr[person], self.person_indptr[person + 1]
+        titles = self.title_ids[self.person_titles[start:end]]
+        roles = self.person_roles[start:end]
+        return [(int(pk), ROLE_NAMES[int(role)]) for pk, role in zip(titles, roles)]
+
+    def collaborators(self, person, limit=10):
+        """[(person id, shared title count)] for the people a person worked with most"""
+        start, end = self.person_indptr[person], self.person_indptr[person + 1]
+        titles = np.asarray(self.person_titles[start:end])
+        _, people = _expand(self.title_indptr, self.title_people, titles)
+        people = people[people != person]
+        if not len(people):
+            return []
+        ids, counts = np.unique(people, return_counts=True)
+        # Most shared titles first; ties go to the person seen first in the catalog
+        order = np.lexsort((ids, -counts))[:limit]
+        return [(int(ids[i]), int(counts[i])) for i in order]
+
+    def shortest_path(self, source, target, max_depth=MAX_PATH_DEPTH):
+        """
+        Breadth-first search from source to target over person -> title -> person hops.
+
+        Returns the path as [person, title index, person, ...] or None.
+        """
+        if source == target:
+            return [source]
+        person_parent = np.full(len(self.names), -1, dtype=np.int64)
+        title_parent = np.full(len(self.title_ids), -1, dtype=np.int64)
+        person_parent[source] = source
+        frontier = np.asarray([source], dtype=np.int32)
+
+        for _ in range(max_depth):
+            sources, titles = _expand(self.person_indptr, self.person_titles, frontier)
+            new = title_parent[titles] == -1
+            titles, first = np.unique(titles[new], return_index=True)
+            title_parent[titles] = sources[new][first]
+
+            sources, people = _expand(self.title_indptr, self.title_people, titles.astype(np.int32))
+            new = person_parent[people] == -1
+            people, first = np.unique(people[new], return_index=True)
+            person_parent[people] = sources[new][first]
+
+            if person_parent[target] != -1:
+                path = [target]
+                person = target
+                while person != source:
+                    title = int(person_parent[person])
+                    person = int(title_parent[title])
+                    path.extend([title, person])
+                return path[::-1]
+            if not len(people):
+                return None
+            frontier = people.astype(np.int32)
+        return None
+
+
+_loaded = None
+_loaded_version = None
+_load_lock = threading.Lock()
+
+
+def get_graph():
+    """Return the current graph, reloading when a newer version was built"""
+
+    global _loaded, _loaded_version
+    version = published_version()
+    if version is None:
+        raise GraphNotBuilt('The people graph has not been built yet (run build_people_graph).')
+
+    with _load_lock:
+        if version != _loaded_version:
+            _loaded = PeopleGraph(os.path.join(graph_root(), version))
+            _loaded_version = version
+        return _loaded
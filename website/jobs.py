@@ -0,0 +1,281 @@
+"""
+Lightweight job queue stored in the Job table.
+
+enqueue() adds a job and the run_jobs worker (its own process, see the
+Procfile) claims queued jobs one at a time and runs the handler registered
+for the job's kind. Handlers report progress and a checkpoint through
+JobProgress. A job whose worker stops heartbeating is requeued, and its next
+attempt starts from the last checkpoint.
+"""
+
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+from io import StringIO
+from django.conf import settings
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .changes import compact_changes
+from .facets import rebuild_facets
+from .graph import build_graph
+from .models import Job
+from .readmodel import rebuild_listings
+from .rollups import rebuild_rollups
+from .snapshots import build_snapshot
+
+HANDLERS = {}
+# Accepted params per job kind: {kind: {name: cleaner}}; a cleaner returns the value or raises ValueError
+PARAMS = {}
+# Checks across a kind's cleaned params: {kind: check(params)}, raising ValueError
+PARAM_CHECKS = {}
+
+
+def job_handler(kind, params=None, check=None):
+    """Register func(job, progress) as the handler for a job kind that accepts the given params"""
+
+    def register(func):
+        HANDLERS[kind] = func
+        PARAMS[kind] = params or {}
+        if check is not None:
+            PARAM_CHECKS[kind] = check
+        return func
+    return register
+
+
+def clean_params(kind, params):
+    """Return params checked against what the job kind accepts (raises ValueError)"""
+
+    accepted = PARAMS.get(kind, {})
+    unknown = sorted(set(params) - set(accepted))
+    if unknown:
+        raise ValueError(f"Unknown params for '{kind}': {', '.join(unknown)}")
+    cleaned = {}
+    for name, value in params.items():
+        try:
+            cleaned[name] = accepted[name](value)
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"Invalid '{name}': {exc}")
+    if kind in PARAM_CHECKS:
+        PARAM_CHECKS[kind](cleaned)
+    return cleaned
+
+
+def _resolve(path):
+    return os.path.realpath(os.path.join(settings.BASE_DIR, path))
+
+
+def data_path(value):
+    """A file path inside JOB_DATA_DIR (relative paths start at the project directory)"""
+
+    if not isinstance(value, str) or not value:
+        raise ValueError('must be a file path')
+    root = os.path.realpath(settings.JOB_DATA_DIR)
+    path = _resolve(value)
+    if os.path.commonpath([root, path]) != root or path == root:
+        raise ValueError(f'must be a file inside {settings.JOB_DATA_DIR}')
+    return path
+
+
+def whole_number(minimum):
+    def clean(value):
+        if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+            raise ValueError(f'must be a whole number of at least {minimum}')
+        return value
+    return clean
+
+
+def flag(value):
+    if not isinstance(value, bool):
+        raise ValueError('must be true or false')
+    return value
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def enqueue(kind, params=None, dedupe_key=None, run_after=None):
+    """
+    Queue a job; returns (job, created).
+
+    While a job with the same dedupe key (the kind by default) is queued or
+    running, that job is returned instead of queueing a second one. A job
+    given run_after is not claimed before that time.
+    """
+
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    params = clean_params(kind, params or {})
+    key = dedupe_key or kind
+    while True:
+        try:
+            with transaction.atomic():
+                return Job.objects.create(kind=kind, params=params, dedupe_key=key, run_after=run_after), True
+        except IntegrityError:
+            existing = Job.objects.filter(dedupe_key=key, status__in=Job.ACTIVE).first()
+            if existing is not None:
+                return existing, False
+            # The active job finished in between; try again
+
+
+def requeue_stale_jobs():
+    """Put running jobs whose worker stopped heartbeating back in the queue (or fail them)"""
+
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_STALE_AFTER)
+    stale = Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=cutoff)
+    stale.filter(attempts__gte=settings.JOB_MAX_ATTEMPTS).update(
+        status=Job.FAILED, error='Worker stopped responding', finished_at=timezone.now(),
+    )
+    return stale.update(status=Job.QUEUED, worker='')
+
+
+def claim_next(worker):
+    """Mark the oldest queued job that is due as running for this worker; None if there is none"""
+
+    requeue_stale_jobs()
+    while True:
+        due = Q(run_after__isnull=True) | Q(run_after__lte=timezone.now())
+        job = Job.objects.filter(due, status=Job.QUEUED).order_by('pk').first()
+        if job is None:
+            return None
+        now = timezone.now()
+        # Conditional UPDATE, so two workers cannot claim the same job
+        claimed = Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, worker=worker, attempts=F('attempts') + 1,
+            started_at=now, heartbeat_at=now, rate=None,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+class JobProgress:
+    """Passed to a job handler to report progress and checkpoints"""
+
+    def __init__(self, job):
+        self.job = job
+        self.started = time.perf_counter()
+        self.started_done = job.done  # Work done by earlier attempts
+
+    @property
+    def checkpoint(self):
+        return self.job.checkpoint
+
+    def update(self, done, total=None, checkpoint=None, message=None):
+        job = self.job
+        job.done = done
+        if total is not None:
+            job.total = total
+        if checkpoint is not None:
+            job.checkpoint = checkpoint
+        if message is not None:
+            job.message = message
+        elapsed = time.perf_counter() - self.started
+        if elapsed > 0 and done > self.started_done:
+            job.rate = (done - self.started_done) / elapsed
+        job.heartbeat_at = timezone.now()
+        Job.objects.filter(pk=job.pk).update(
+            done=job.done, total=job.total, rate=job.rate, message=job.message,
+            checkpoint=job.checkpoint, heartbeat_at=job.heartbeat_at,
+        )
+
+
+def _heartbeat(job_pk, stop):
+    try:
+        while not stop.wait(settings.JOB_HEARTBEAT_INTERVAL):
+            try:
+                Job.objects.filter(pk=job_pk, status=Job.RUNNING).update(heartbeat_at=timezone.now())
+            except OperationalError:  # The job itself holds the write lock; try next time
+                pass
+    finally:
+        connection.close()
+
+
+def run_job(job):
+    """Run a claimed job to completion and record the outcome"""
+
+    # Handlers that go quiet for a while still count as alive
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(job.pk, stop), daemon=True)
+    heartbeat.start()
+    try:
+        # Checked again here: the job may have been queued before a param was restricted
+        job.params = clean_params(job.kind, job.params)
+        HANDLERS[job.kind](job, JobProgress(job))
+    except Exception:
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.FAILED, error=traceback.format_exc(), finished_at=timezone.now(),
+        )
+    else:
+        Job.objects.filter(pk=job.pk).update(status=Job.SUCCEEDED, finished_at=timezone.now())
+    finally:
+        stop.set()
+        heartbeat.join()
+    job.refresh_from_db()
+    return job
+
+
+# The load_netflix_data options an import job may set
+IMPORT_PARAMS = {
+    'file': data_path,
+    'quarantine': data_path,
+    'chunk_size': whole_number(1),
+    'batch_size': whole_number(1),
+    'workers': whole_number(0),
+}
+
+
+def check_import_params(params):
+    # The quarantine file is truncated when an import starts
+    source = params.get('file', _resolve('data/netflix_titles.csv'))
+    if params.get('quarantine', _resolve('data/quarantine.csv')) == source:
+        raise ValueError("'quarantine' must not be the file being imported")
+
+
+@job_handler('import_titles', params=IMPORT_PARAMS, check=check_import_params)
+def import_titles(job, progress):
+    """load_netflix_data, resuming after the last committed batch"""
+
+    call_command(
+        'load_netflix_data', resume_after_line=progress.checkpoint.get('line', 0),
+        progress=progress.update, stdout=StringIO(), **job.params,
+    )
+
+
+@job_handler('rebuild_read_models')
+def rebuild_read_models(job, progress):
+    steps = [('listings', rebuild_listings), ('rollups', rebuild_rollups), ('facets', rebuild_facets)]
+    for done, (name, rebuild) in enumerate(steps):
+        progress.update(done, total=len(steps), message=f'Rebuilding {name}')
+        rebuild()
+    progress.update(len(steps), message='Done')
+
+
+@job_handler('rebuild_search_index')
+def rebuild_search_index(job, progress):
+    """Rebuild the admin's FTS5 index from the Title table"""
+
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO website_title_fts(website_title_fts) VALUES ('rebuild')")
+    progress.update(1, total=1)
+
+
+@job_handler('build_people_graph')
+def build_people_graph(job, progress):
+    version = build_graph()
+    progress.update(1, total=1, message=f'Graph version {version}')
+
+
+@job_handler('build_catalog_snapshot', params={'force': flag})
+def build_catalog_snapshot(job, progress):
+    """Build the catalog snapshot, then compact the change log it was built from"""
+
+    manifest = build_snapshot(force=job.params.get('force', False))
+    removed = compact_changes()
+    progress.update(1, total=1, message=f"Snapshot version {manifest['version']}, {removed} changes compacted")
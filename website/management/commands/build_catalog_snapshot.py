@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from website.snapshots import build_snapshot
+
+class Command(BaseCommand):
+    help = 'Renders the precompressed catalog snapshot into STATIC_ROOT/snapshots/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=3, help='Number of snapshot versions to keep on disk')
+        parser.add_argument('--force', action='store_true', help='Rebuild even if the current version exists')
+
+    def handle(self, *args, **options):
+        manifest = build_snapshot(keep=options['keep'], force=options['force'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Catalog snapshot v{manifest['version']} at {manifest['url']} "
+            f"({manifest['size']} bytes, gzip {manifest['gzip_size']}, brotli {manifest['brotli_size']})"
+        ))
@@ -0,0 +1,15 @@
+import time
+from django.core.management.base import BaseCommand
+from website.graph import build_graph, get_graph
+
+class Command(BaseCommand):
+    help = 'Builds the cast/crew collaboration graph arrays from the Title table'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        version = build_graph()
+        graph = get_graph()
+        self.stdout.write(self.style.SUCCESS(
+            f'People graph {version} built in {time.perf_counter() - started:.2f}s: '
+            f'{len(graph.names)} people, {len(graph.title_ids)} titles, {len(graph.person_titles)} credits'
+        ))
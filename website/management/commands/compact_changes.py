@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from website.changes import compact_changes
+
+class Command(BaseCommand):
+    help = 'Compacts the title change log, keeping only the newest entry per title'
+
+    def handle(self, *args, **options):
+        removed = compact_changes()
+        self.stdout.write(self.style.SUCCESS(f'Change log compacted, {removed} superseded entries removed'))
@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from website.duplicates import DUPLICATE_THRESHOLD, find_duplicates
+
+class Command(BaseCommand):
+    help = 'Lists likely duplicate titles (similar names with the same release year and type), best match first'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=DUPLICATE_THRESHOLD,
+                            help='Minimum trigram cosine similarity (0-1) to report')
+        parser.add_argument('--limit', type=int, default=50, help='Pairs to print (0 prints all)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        pairs, stats = find_duplicates(options['threshold'])
+        elapsed = time.perf_counter() - started
+
+        shown = pairs[:options['limit']] if options['limit'] else pairs
+        for score, (pk_a, show_id_a, title_a), (pk_b, show_id_b, title_b) in shown:
+            self.stdout.write(f'{score:.3f}  #{pk_a} {show_id_a} "{title_a}"  ~  #{pk_b} {show_id_b} "{title_b}"')
+
+        all_pairs = stats['titles'] * (stats['titles'] - 1) // 2
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(pairs)} candidate pairs in {elapsed:.2f}s: {stats['titles']} titles in {stats['blocks']} blocks, "
+            f"{stats['comparisons']} comparisons instead of {all_pairs}"
+        ))
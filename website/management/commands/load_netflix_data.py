@@ -1,48 +1,233 @@
 import csv
-from datetime import datetime
-from django.core.management.base import BaseCommand
+from bisect import bisect_right
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from rest_framework.exceptions import ValidationError
 from website.models import Title
+from website.parsing import parse_chunk
+from website.rollups import rebuild_rollups
+from website.facets import rebuild_facets
+from website.changes import compact_changes
+from website.snapshots import build_snapshot
+from website.serializers import TitleImportSerializer
+from website.signals import titles_bulk_written
+
+# Every column except show_id, which is the key rows are matched on
+UPDATE_FIELDS = [
+    'type', 'title', 'director', 'cast', 'country', 'date_added',
+    'release_year', 'rating', 'duration', 'listed_in', 'description',
+]
+
+STAGES = ['read', 'parse', 'validate', 'write']
 
 class Command(BaseCommand):
     help = 'Loads data from netflix_titles.csv into the Title model'
+    # progress(done, total=, checkpoint=, message=) is called inside each batch's
+    # transaction when the command runs as a background job (see website/jobs.py)
+    stealth_options = ('progress',)
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default='data/netflix_titles.csv', help='CSV file to load')
+        parser.add_argument('--quarantine', default='data/quarantine.csv', help='CSV file that receives rejected rows')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows handed to a parser process at a time')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows written per transaction')
+        parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1),
+                            help='Parser processes (0 parses in this process)')
+        parser.add_argument('--resume-after-line', type=int, default=0,
+                            help='Skip CSV rows up to this line (the checkpoint of an interrupted import)')
 
     def handle(self, *args, **options):
-        # Path to the CSV file
-        csv_file_path = 'data/netflix_titles.csv'
-        
+        # Pipeline: streaming reader -> parse/normalize (process pool) -> validate -> batched writer.
+        # Only a bounded number of chunks is in flight at once, so memory does not grow with the file.
+        csv_file_path = options['file']
+        if not os.path.exists(csv_file_path):
+            raise CommandError(f"File not found: {csv_file_path}")
+
+        self.stage_rows = dict.fromkeys(STAGES, 0)
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self.loaded = 0
+        self.unchanged = 0
+        self.rejected = 0
+        self.progress = options.get('progress')
+        self.resume_after = options['resume_after_line']
+        self.consumed = 0  # CSV rows handled so far, including skipped and rejected ones
+        self.total = self.count_rows(csv_file_path) if self.progress else None
+        started = time.perf_counter()
+
         self.stdout.write(self.style.SUCCESS('Starting to load data...'))
 
-        # Use update_or_create to avoid creating duplicate entries if the command is run multiple times.
-        # It tries to find an object with the given 'show_id'. If it finds one, it updates it.
-        # If not, it creates a new one.
-        
-        with open(csv_file_path, 'r', encoding='utf-8') as file:
+        # A resumed import keeps what the interrupted one quarantined up to its
+        # checkpoint; the rows after it are read, and rejected, again
+        settled = self.settled_quarantine(options['quarantine']) if self.resume_after else []
+        with open(csv_file_path, 'r', encoding='utf-8', newline='') as file, \
+                open(options['quarantine'], 'w', encoding='utf-8', newline='') as quarantine_file:
             reader = csv.DictReader(file)
-            for row in reader:
-                # The 'date_added' field needs special handling to convert it from a string to a Date object.
-                date_added_obj = None
-                date_str = row.get('date_added', '').strip()
-                if date_str:
-                    try:
-                        date_added_obj = datetime.strptime(date_str, '%B %d, %Y').date()
-                    except ValueError:
-                        self.stdout.write(self.style.WARNING(f"Could not parse date '{date_str}' for show_id {row['show_id']}. Skipping date."))
-
-                Title.objects.update_or_create(
-                    show_id=row['show_id'],
-                    defaults={
-                        'type': row['type'],
-                        'title': row['title'],
-                        'director': row['director'] if row['director'] else None,
-                        'cast': row['cast'] if row['cast'] else None,
-                        'country': row['country'] if row['country'] else None,
-                        'date_added': date_added_obj,
-                        'release_year': int(row['release_year']),
-                        'rating': row['rating'] if row['rating'] else None,
-                        'duration': row['duration'] if row['duration'] else None,
-                        'listed_in': row['listed_in'],
-                        'description': row['description'],
-                    }
+            self.quarantine = csv.writer(quarantine_file)
+            if settled:
+                self.quarantine.writerows(settled)
+            else:
+                self.quarantine.writerow(['line'] + list(reader.fieldnames or []) + ['errors'])
+
+            # Keyed by show_id so a repeated show_id within a batch keeps its last row
+            batch = {}
+            last_line = self.resume_after
+            chunks = self.read_stage(reader, options['chunk_size'])
+            for parsed, rejects, seconds in self.parse_stage(chunks, options['workers']):
+                self.record('parse', len(parsed) + len(rejects), seconds)
+                for line_no, row, errors in rejects:
+                    self.reject(line_no, row, errors)
+
+                # Every row of the chunk up to the one that fills a batch is
+                # settled once that batch commits, which is the checkpoint
+                chunk_lines = sorted([line_no for line_no, *_ in parsed] + [line_no for line_no, *_ in rejects])
+                for line_no, show_id, values in self.validate_stage(parsed):
+                    batch[show_id] = values
+                    if len(batch) >= options['batch_size']:
+                        self.write_stage(batch, line_no, self.consumed + bisect_right(chunk_lines, line_no))
+                        batch = {}
+                self.consumed += len(chunk_lines)
+                last_line = chunk_lines[-1] if chunk_lines else last_line
+            if batch:
+                self.write_stage(batch, last_line, self.consumed)
+
+        if self.progress:
+            self.progress(self.consumed, message='Rebuilding derived tables')
+
+        # Bulk writes skip the per-row hooks, so rebuild the derived tables once at the end
+        rebuild_rollups()
+        rebuild_facets()
+        # A re-import appends an entry per title; keep only the newest per title
+        compact_changes()
+        manifest = build_snapshot()
+
+        elapsed = time.perf_counter() - started
+        for stage in STAGES:
+            rows, seconds = self.stage_rows[stage], self.stage_seconds[stage]
+            rate = rows / seconds if seconds else 0
+            self.stdout.write(f"  {stage:<9} {rows:>8} rows  {seconds:8.2f}s  {rate:>10.0f} rows/s")
+        self.stdout.write(f"  snapshot  v{manifest['version']} at {manifest['url']}")
+        if self.rejected:
+            self.stdout.write(self.style.WARNING(
+                f"{self.rejected} rows rejected, see {options['quarantine']}"
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Data loading complete! {self.loaded} titles written ({self.unchanged} unchanged) in {elapsed:.2f}s'
+        ))
+
+    def record(self, stage, rows, seconds):
+        self.stage_rows[stage] += rows
+        self.stage_seconds[stage] += seconds
+
+    def settled_quarantine(self, path):
+        """Header and rows of an earlier quarantine file up to the resume line"""
+
+        try:
+            with open(path, 'r', encoding='utf-8', newline='') as file:
+                rows = list(csv.reader(file))
+        except FileNotFoundError:
+            return []
+        return rows[:1] + [row for row in rows[1:] if int(row[0]) <= self.resume_after]
+
+    def count_rows(self, path):
+        with open(path, 'r', encoding='utf-8', newline='') as file:
+            return sum(1 for _ in csv.DictReader(file))
+
+    def read_stage(self, reader, chunk_size):
+        """Stream (line_no, row) chunks from the CSV"""
+
+        chunk = []
+        started = time.perf_counter()
+        for row in reader:
+            if reader.line_num <= self.resume_after:
+                self.consumed += 1
+                continue
+            chunk.append((reader.line_num, row))
+            if len(chunk) >= chunk_size:
+                self.record('read', len(chunk), time.perf_counter() - started)
+                yield chunk
+                chunk = []
+                started = time.perf_counter()
+        if chunk:
+            self.record('read', len(chunk), time.perf_counter() - started)
+            yield chunk
+
+    def parse_stage(self, chunks, workers):
+        """Normalize chunks in worker processes, yielding results in file order"""
+
+        if workers <= 0:
+            for chunk in chunks:
+                yield parse_chunk(chunk)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = deque()
+            for chunk in chunks:
+                in_flight.append(pool.submit(parse_chunk, chunk))
+                if len(in_flight) >= workers * 2:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+
+    def validate_stage(self, parsed):
+        """Apply the TitleCreateSerializer rules, sending failures to the quarantine file"""
+
+        started = time.perf_counter()
+        # One serializer instance is reused so its fields are only built once
+        serializer = TitleImportSerializer()
+        valid = []
+        for line_no, row, values in parsed:
+            try:
+                valid.append((line_no, values['show_id'], serializer.run_validation(values)))
+            except ValidationError as exc:
+                self.reject(line_no, row, exc.detail)
+        self.record('validate', len(parsed), time.perf_counter() - started)
+        return valid
+
+    def write_stage(self, batch, line_no, consumed):
+        """Upsert one batch of validated rows in a single transaction"""
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            stored = {
+                row['show_id']: row
+                for row in Title.objects.filter(show_id__in=list(batch)).values('pk', 'show_id', *UPDATE_FIELDS)
+            }
+            # Rows identical to the stored title are skipped, so their version (the ETag) stays put
+            titles = [
+                title for title in (Title(**values) for values in batch.values())
+                if title.show_id not in stored
+                or any(getattr(title, field) != stored[title.show_id][field] for field in UPDATE_FIELDS)
+            ]
+            pks = []
+            if titles:
+                Title.objects.bulk_create(
+                    titles,
+                    update_conflicts=True,
+                    unique_fields=['show_id'],
+                    update_fields=UPDATE_FIELDS,
                 )
+                # The upsert cannot increment, so move updated titles to their next version here
+                updated = [stored[title.show_id]['pk'] for title in titles if title.show_id in stored]
+                Title.objects.filter(pk__in=updated).update(version=F('version') + 1)
+                pks = list(Title.objects.filter(show_id__in=[title.show_id for title in titles])
+                           .values_list('pk', flat=True))
+            if self.progress:
+                self.progress(consumed, total=self.total, checkpoint={'line': line_no}, message='Importing')
+        if pks:
+            titles_bulk_written.send(sender=Title, pks=pks)
+
+        self.loaded += len(titles)
+        self.unchanged += len(batch) - len(titles)
+        self.record('write', len(batch), time.perf_counter() - started)
 
-        self.stdout.write(self.style.SUCCESS('Data loading complete!'))
\ No newline at end of file
+    def reject(self, line_no, row, errors):
+        self.rejected += 1
+        self.quarantine.writerow(
+            [line_no] + list(row.values()) + [json.dumps(errors, default=str)]
+        )
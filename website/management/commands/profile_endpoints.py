@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from website.profiling import clear_profiles, recent_profiles
+
+DEFAULT_PATHS = [
+    '/api/titles/',
+    '/api/titles/movies/',
+    '/api/titles/recent/?days=3650',
+    '/api/titles/by-genre/Dramas/',
+    '/api/titles/stats/',
+    '/api/titles/timeline/',
+    '/api/titles/changes/?since=0',
+]
+
+class Command(BaseCommand):
+    help = 'Requests API endpoints in-process with memory profiling on and prints peak memory per endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='Paths to request (default: the main read endpoints)')
+        parser.add_argument('--repeat', type=int, default=1, help='Requests per path (the first one is cold)')
+        parser.add_argument('--max-peak-kb', type=float, help='Fail if any request peaks above this many KB')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        host = next((host for host in settings.ALLOWED_HOSTS if '*' not in host and not host.startswith('.')), 'localhost')
+        client = Client(HTTP_HOST=host)
+
+        clear_profiles()
+        with override_settings(PROFILING_SAMPLE_RATE=1.0):
+            for path in paths:
+                for _ in range(options['repeat']):
+                    client.get(path)
+        profiles = list(reversed(recent_profiles()))
+
+        self.stdout.write(f"{'path':<40} {'status':>6} {'ms':>8} {'peak KB':>9} {'instances':>9} {'queries':>7}  top allocation")
+        for profile in profiles:
+            top = profile['hot_spots'][0] if profile['hot_spots'] else None
+            self.stdout.write(
+                f"{profile['path'][:40]:<40} {profile['status']:>6} {profile['duration_ms']:>8.1f} "
+                f"{profile['peak_kb']:>9.1f} {profile['instances']:>9} {profile['queries']:>7}  "
+                + (f"{top['location']} ({top['size_kb']} KB)" if top else '')
+            )
+
+        budget = options['max_peak_kb']
+        over = [profile for profile in profiles if budget is not None and profile['peak_kb'] > budget]
+        if over:
+            raise CommandError(
+                f'{len(over)} requests peaked above {budget} KB: '
+                + ', '.join(f"{profile['path']} ({profile['peak_kb']} KB)" for profile in over)
+            )
+        self.stdout.write(self.style.SUCCESS(f'Profiled {len(profiles)} requests'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from website.readmodel import rebuild_listings
+from website.rollups import rebuild_rollups
+from website.facets import rebuild_facets
+
+class Command(BaseCommand):
+    help = 'Rebuilds the tables derived from Title (list read model, timeline rollups and admin facets)'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Rebuilding read models...'))
+        self.stdout.write(f'  listings: {rebuild_listings()} rows')
+        self.stdout.write(f'  rollups:  {rebuild_rollups()} rows')
+        self.stdout.write(f'  facets:   {rebuild_facets()} rows')
+        self.stdout.write(self.style.SUCCESS('Rebuild complete!'))
@@ -0,0 +1,89 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from website import backups
+from website.cache import clear_title_details
+from website.changes import compact_changes, latest_seq, record_resync
+from website.facets import rebuild_facets
+from website.graph import build_graph
+from website.models import Title
+from website.readmodel import rebuild_listings
+from website.rollups import rebuild_rollups
+from website.snapshots import build_snapshot
+
+class Command(BaseCommand):
+    help = 'Restores the SQLite database from a snapshot file, or the Title table from a Parquet export'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='source', help='Backup file written by the snapshot command')
+        parser.add_argument('--parquet', help='Parquet export of the Title table written by the snapshot command')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='Do not ask for confirmation')
+        parser.add_argument('--benchmark', action='store_true',
+                            help='Only time the restore paths against scratch databases; the live database is not touched')
+        parser.add_argument('--dump', default='output_file.txt',
+                            help='Textual SQL dump to compare against with --benchmark')
+
+    def handle(self, *args, **options):
+        source, parquet = options['source'], options['parquet']
+        for path in (source, parquet):
+            if path and not os.path.exists(path):
+                raise CommandError(f"File not found: {path}")
+
+        if options['benchmark']:
+            return self.benchmark(source, parquet, options['dump'])
+
+        if bool(source) == bool(parquet):
+            raise CommandError('Pass exactly one of --from or --parquet')
+
+        if options['interactive']:
+            target = 'the whole database' if source else 'every title'
+            answer = input(f'This replaces {target}. Type "yes" to continue: ')
+            if answer != 'yes':
+                raise CommandError('Restore cancelled.')
+
+        previous_seq = latest_seq()
+        if source:
+            before = dict(Title.objects.values_list('pk', 'show_id'))
+            try:
+                seconds = backups.restore_from_file(source)
+            except ValueError as exc:
+                raise CommandError(exc)
+            # The restored file carries its own derived tables, but its change
+            # log stops where the backup was taken
+            with transaction.atomic():
+                restored = set(Title.objects.values_list('pk', flat=True))
+                removed = sorted((pk, show_id) for pk, show_id in before.items() if pk not in restored)
+                record_resync(removed, previous_seq)
+                compact_changes()
+            message = f'Database restored from {source} in {seconds:.2f}s'
+        else:
+            with transaction.atomic():
+                pks, removed, seconds = backups.import_titles_parquet(parquet)
+                rebuild_listings()
+                rebuild_rollups()
+                rebuild_facets()
+                record_resync(removed, previous_seq)
+                compact_changes()
+            message = f'{len(pks)} titles restored from {parquet} in {seconds:.2f}s ({len(removed)} removed)'
+
+        clear_title_details()
+        build_snapshot()
+        build_graph()
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def benchmark(self, source, parquet, dump):
+        timings = []
+        if dump:
+            if not os.path.exists(dump):
+                raise CommandError(f"File not found: {dump}")
+            timings.append((f'replay SQL text dump ({dump})', backups.time_dump_replay(dump)))
+        if source:
+            timings.append((f'backup API restore ({source})', backups.time_file_restore(source)))
+        if parquet:
+            timings.append((f'Parquet bulk insert ({parquet})', backups.time_parquet_load(parquet)))
+
+        baseline = timings[0][1] if timings else None
+        for label, seconds in timings:
+            speedup = f'{baseline / seconds:6.1f}x' if baseline and seconds else ''
+            self.stdout.write(f'  {label:<60} {seconds:8.3f}s  {speedup}')
@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand
+from website.jobs import claim_next, run_job, worker_name
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs (imports and rebuilds); see /api/jobs/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty instead of polling')
+        parser.add_argument('--poll', type=float, default=2.0, help='Seconds to wait between polls of an empty queue')
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        self.stdout.write(self.style.SUCCESS(f'Job worker {worker} started'))
+        while True:
+            job = claim_next(worker)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll'])
+                continue
+
+            self.stdout.write(f'Running job #{job.pk} {job.kind} (attempt {job.attempts})')
+            job = run_job(job)
+            if job.status == job.SUCCEEDED:
+                elapsed = (job.finished_at - job.started_at).total_seconds()
+                self.stdout.write(self.style.SUCCESS(f'Job #{job.pk} finished in {elapsed:.2f}s'))
+            else:
+                self.stdout.write(self.style.ERROR(f'Job #{job.pk} failed:\n{job.error}'))
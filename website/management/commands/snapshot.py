@@ -0,0 +1,35 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from website.backups import backup_to_file, export_titles_parquet
+
+class Command(BaseCommand):
+    help = 'Takes a consistent hot copy of the SQLite database, optionally with a Parquet export of Title'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Backup file to write (default: backups/db-<timestamp>.sqlite3)')
+        parser.add_argument('--parquet', help='Also export the Title table to this Parquet file')
+
+    def handle(self, *args, **options):
+        output = options['output'] or os.path.join(
+            'backups', f"db-{timezone.now().strftime('%Y%m%d-%H%M%S')}.sqlite3"
+        )
+        if os.path.dirname(output):
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+
+        try:
+            seconds = backup_to_file(output)
+        except ValueError as exc:
+            raise CommandError(exc)
+        size = os.path.getsize(output)
+        self.stdout.write(self.style.SUCCESS(f'Database copied to {output} ({size} bytes) in {seconds:.2f}s'))
+
+        if options['parquet']:
+            try:
+                rows, seconds = export_titles_parquet(options['parquet'])
+            except ImportError:
+                raise CommandError('Parquet export needs pandas and pyarrow installed')
+            size = os.path.getsize(options['parquet'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{rows} titles exported to {options['parquet']} ({size} bytes) in {seconds:.2f}s"
+            ))
@@ -0,0 +1,90 @@
+import os
+import random
+import re
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+from .profiling import RequestProfile, profiling_lock, record_profile
+from .snapshots import SNAPSHOT_DIR
+
+# Versioned snapshot files never change once written
+VERSIONED_SNAPSHOT = re.compile(r'/catalog-\d+\.json$')
+
+
+class SnapshotWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise that also serves catalog snapshots written after the worker started"""
+
+    @property
+    def snapshot_prefix(self):
+        return f'{self.static_prefix}{SNAPSHOT_DIR}/'
+
+    def __call__(self, request):
+        url = request.path_info
+        if url.startswith(self.snapshot_prefix) and self.static_root and self.url_is_canonical(url):
+            path = os.path.join(self.static_root, SNAPSHOT_DIR, url[len(self.snapshot_prefix):])
+            if not os.path.isfile(path):
+                # Old snapshots are removed by whichever process builds a new one
+                self.files.pop(url, None)
+            elif url not in self.files and not self.is_compressed_variant(path):
+                self.add_file_to_dictionary(url, path)
+        return super().__call__(request)
+
+    def immutable_file_test(self, path, url):
+        if url.startswith(self.snapshot_prefix) and VERSIONED_SNAPSHOT.search(url):
+            return True
+        return super().immutable_file_test(path, url)
+
+
+class ProfilingMiddleware:
+    """
+    Memory-profiles requests to the API views (see website/profiling.py).
+
+    A request is profiled when a staff user sends an X-Profile header, or at
+    random with probability PROFILING_SAMPLE_RATE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._profile_trigger = self.trigger(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profile = getattr(request, '_profile', None)
+            if profile is not None:
+                # Started in process_view; the response is rendered by now
+                try:
+                    profile.__exit__(None, None, None)
+                finally:
+                    profiling_lock.release()
+        if profile is not None:
+            result = record_profile({
+                'method': request.method,
+                'path': request.get_full_path(),
+                'view': request.resolver_match.view_name,
+                'status': response.status_code,
+                'trigger': request._profile_trigger,
+                **profile.result,
+            })
+            response['X-Profile-Id'] = str(result['id'])
+            response['X-Profile-Peak-KB'] = str(result['peak_kb'])
+        return response
+
+    def trigger(self, request):
+        if request.headers.get('X-Profile') and getattr(request, 'user', None) and request.user.is_staff:
+            return 'header'
+        rate = settings.PROFILING_SAMPLE_RATE
+        if rate and random.random() < rate:
+            return 'sample'
+        return None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Only the views in website/views.py, and one request at a time
+        if request._profile_trigger and getattr(view_func, '__module__', None) == 'website.views':
+            if profiling_lock.acquire(blocking=False):
+                try:
+                    request._profile = RequestProfile().__enter__()
+                except BaseException:
+                    profiling_lock.release()
+                    raise
+        return None
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.3 on 2026-10-19 14:50
+
+from collections import Counter
+from datetime import date, timedelta
+from django.db import migrations, models
+from website.parsing import split_list
+
+
+def period_start(granularity, day):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return date(day.year, 1, 1)
+
+
+def seed_rollups(apps, schema_editor):
+    """Count the titles already in the catalog, so the timeline is right straight after migrating"""
+    Title = apps.get_model('website', 'Title')
+    TitleAdditionRollup = apps.get_model('website', 'TitleAdditionRollup')
+    counts = Counter()
+    rows = Title.objects.filter(date_added__isnull=False).values_list('type', 'date_added', 'listed_in')
+    for title_type, date_added, listed_in in rows.iterator(chunk_size=2000):
+        genres = [''] + list(dict.fromkeys(split_list(listed_in)))
+        counts.update(
+            (granularity, period_start(granularity, date_added), bucket_type, genre)
+            for granularity in ['week', 'month', 'year']
+            for bucket_type in ['', title_type]
+            for genre in genres
+        )
+    TitleAdditionRollup.objects.bulk_create(
+        [
+            TitleAdditionRollup(granularity=granularity, period=period, type=title_type, genre=genre, count=count)
+            for (granularity, period, title_type, genre), count in counts.items()
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0002_alter_title_options_alter_title_cast_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleAdditionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(max_length=5)),
+                ('period', models.DateField()),
+                ('type', models.CharField(blank=True, max_length=20)),
+                ('genre', models.CharField(blank=True, max_length=100)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['period'],
+                'constraints': [models.UniqueConstraint(fields=('granularity', 'type', 'genre', 'period'), name='unique_addition_rollup')],
+            },
+        ),
+        migrations.RunPython(seed_rollups, migrations.RunPython.noop),
+    ]
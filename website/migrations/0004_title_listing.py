@@ -0,0 +1,64 @@
+# Generated by Django 5.2.3 on 2026-10-19 14:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+from website.parsing import parse_duration, split_list
+
+# The fields TitleListSerializer puts in each listing's payload
+PAYLOAD_FIELDS = ['id', 'show_id', 'type', 'title', 'release_year', 'rating', 'duration', 'listed_in']
+
+
+def seed_listings(apps, schema_editor):
+    """Build a listing for every existing title, so the list endpoints work straight after migrating"""
+    Title = apps.get_model('website', 'Title')
+    TitleListing = apps.get_model('website', 'TitleListing')
+    batch = []
+    for title in Title.objects.order_by('pk').iterator(chunk_size=2000):
+        minutes, seasons = parse_duration(title.duration)
+        batch.append(TitleListing(
+            title_id=title.pk,
+            sort_title=title.title,
+            type=title.type,
+            release_year=title.release_year,
+            date_added=title.date_added,
+            listed_in=title.listed_in,
+            genres=split_list(title.listed_in),
+            cast_count=len(split_list(title.cast)),
+            duration_minutes=minutes,
+            duration_seasons=seasons,
+            payload={field: getattr(title, field) for field in PAYLOAD_FIELDS},
+        ))
+        if len(batch) >= 2000:
+            TitleListing.objects.bulk_create(batch)
+            batch = []
+    TitleListing.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0003_title_addition_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleListing',
+            fields=[
+                ('title', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='website.title')),
+                ('sort_title', models.CharField(db_index=True, max_length=255)),
+                ('type', models.CharField(db_index=True, max_length=20)),
+                ('release_year', models.IntegerField(db_index=True)),
+                ('date_added', models.DateField(blank=True, db_index=True, null=True)),
+                ('listed_in', models.TextField()),
+                ('genres', models.JSONField(default=list)),
+                ('cast_count', models.IntegerField(default=0)),
+                ('duration_minutes', models.IntegerField(blank=True, null=True)),
+                ('duration_seasons', models.IntegerField(blank=True, null=True)),
+                ('payload', models.JSONField()),
+            ],
+            options={
+                'ordering': ['sort_title', 'pk'],
+            },
+        ),
+        migrations.RunPython(seed_listings, migrations.RunPython.noop),
+    ]
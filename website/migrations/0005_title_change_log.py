@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-19 14:52
+
+from django.db import migrations, models
+
+
+def seed_change_log(apps, schema_editor):
+    """Start the feed with one change per existing title so since=0 returns the whole catalog"""
+    Title = apps.get_model('website', 'Title')
+    TitleChange = apps.get_model('website', 'TitleChange')
+    TitleChange.objects.bulk_create(
+        [TitleChange(title_id=pk, show_id=show_id) for pk, show_id in Title.objects.order_by('pk').values_list('pk', 'show_id')],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0004_title_listing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('title_id', models.BigIntegerField(db_index=True)),
+                ('show_id', models.CharField(max_length=20)),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['seq'],
+            },
+        ),
+        migrations.RunPython(seed_change_log, migrations.RunPython.noop),
+    ]
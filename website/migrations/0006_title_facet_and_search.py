@@ -0,0 +1,89 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:02
+
+from django.db import migrations, models
+from django.db.models import Count
+
+# SQLite FTS5 index over the admin's search columns. It is an external-content
+# table, so it stores only the index; triggers keep it in step with every write,
+# including bulk inserts, upserts and raw SQL.
+CREATE_TITLE_SEARCH = [
+    """CREATE VIRTUAL TABLE website_title_fts USING fts5(
+        title, director, "cast", description, content='website_title', content_rowid='id'
+    )""",
+    """CREATE TRIGGER website_title_fts_ai AFTER INSERT ON website_title BEGIN
+        INSERT INTO website_title_fts(rowid, title, director, "cast", description)
+        VALUES (new.id, new.title, new.director, new."cast", new.description);
+    END""",
+    """CREATE TRIGGER website_title_fts_ad AFTER DELETE ON website_title BEGIN
+        INSERT INTO website_title_fts(website_title_fts, rowid, title, director, "cast", description)
+        VALUES ('delete', old.id, old.title, old.director, old."cast", old.description);
+    END""",
+    """CREATE TRIGGER website_title_fts_au AFTER UPDATE OF title, director, "cast", description ON website_title BEGIN
+        INSERT INTO website_title_fts(website_title_fts, rowid, title, director, "cast", description)
+        VALUES ('delete', old.id, old.title, old.director, old."cast", old.description);
+        INSERT INTO website_title_fts(rowid, title, director, "cast", description)
+        VALUES (new.id, new.title, new.director, new."cast", new.description);
+    END""",
+    "INSERT INTO website_title_fts(website_title_fts) VALUES ('rebuild')",
+]
+
+DROP_TITLE_SEARCH = [
+    "DROP TRIGGER IF EXISTS website_title_fts_ai",
+    "DROP TRIGGER IF EXISTS website_title_fts_ad",
+    "DROP TRIGGER IF EXISTS website_title_fts_au",
+    "DROP TABLE IF EXISTS website_title_fts",
+]
+
+
+def create_title_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_TITLE_SEARCH:
+        schema_editor.execute(statement)
+
+
+def drop_title_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_TITLE_SEARCH:
+        schema_editor.execute(statement)
+
+
+def seed_facets(apps, schema_editor):
+    Title = apps.get_model('website', 'Title')
+    TitleFacet = apps.get_model('website', 'TitleFacet')
+    for field in ['type', 'rating', 'release_year']:
+        counts = Title.objects.exclude(**{f'{field}__isnull': True}).values(field).annotate(n=Count('id')).order_by()
+        TitleFacet.objects.bulk_create(
+            [TitleFacet(field=field, value=str(row[field]), count=row['n']) for row in counts if row[field] != '']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0005_title_change_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(max_length=20)),
+                ('value', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['field', 'value'],
+                'constraints': [models.UniqueConstraint(fields=('field', 'value'), name='unique_title_facet')],
+            },
+        ),
+        migrations.AlterField(
+            model_name='title',
+            name='title',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.RunPython(seed_facets, migrations.RunPython.noop),
+        migrations.RunPython(create_title_search, drop_title_search),
+    ]
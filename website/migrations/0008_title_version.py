@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:10
+
+from importlib import import_module
+from django.db import migrations, models
+
+title_search = import_module('website.migrations.0006_title_facet_and_search')
+
+
+def recreate_title_search(apps, schema_editor):
+    # SQLite adds a NOT NULL column by rebuilding website_title, which drops the
+    # full-text search triggers; put the index and its triggers back
+    title_search.drop_title_search(apps, schema_editor)
+    title_search.create_title_search(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0007_job_queue'),
+    ]
+
+    operations = [
+        # Reversing the AddField rebuilds the table again, so recreate after that too
+        migrations.RunPython(migrations.RunPython.noop, recreate_title_search),
+        migrations.AddField(
+            model_name='title',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(recreate_title_search, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0008_title_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['release_year', 'type'], name='title_block_idx'),
+        ),
+    ]
@@ -4,7 +4,7 @@ from django.db import models
 class Title(models.Model):
     show_id = models.CharField(max_length = 20, unique = True)
     type = models.CharField(max_length = 20)  # Movie or TV Show
-    title = models.CharField(max_length = 255) #Name of Movie/ Series, (Naruto, Blood & Water)
+    title = models.CharField(max_length = 255, db_index = True) #Name of Movie/ Series, (Naruto, Blood & Water)
     director = models.TextField(null = True, blank = True)  # Multiple Directors, co directors included as well
     cast = models.TextField(null = True, blank = True)  # A lot of actors, a lot of names
     country = models.TextField(null = True, blank = True)  # Multiple countries possible
@@ -14,11 +14,162 @@ class Title(models.Model):
     duration = models.CharField(max_length = 20, null = True, blank = True)
     listed_in = models.TextField()  # Genres
     description = models.TextField() # Synopsis of movie
+    version = models.PositiveIntegerField(default = 1)  # Bumped on every update; the detail endpoint's ETag
     
     def __str__(self):
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what is stored so write hooks can tell what a save changed
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, bump_version=True, **kwargs):
+        # Every update bumps the version in the UPDATE itself, so an instance
+        # loaded a while ago never writes back an older number. The API claims
+        # the next version with a conditional UPDATE first and passes
+        # bump_version=False.
+        bumped = bump_version and not self._state.adding
+        if bumped:
+            self.version = models.F('version') + 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = [*kwargs['update_fields'], 'version']
+        super().save(*args, **kwargs)
+        if bumped:
+            self.refresh_from_db(fields=['version'])
+        self._loaded_values = {field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields}
+
+    @property
+    def stored_values(self):
+        """Column values as last read from or written to the database ({} if unknown)"""
+        return getattr(self, '_loaded_values', {})
     
     class Meta:
         ordering = ['title']
         verbose_name = 'Netflix Title'
-        verbose_name_plural = 'Netflix Titles'
\ No newline at end of file
+        indexes = [
+            # Duplicate detection compares titles within a (release_year, type) block
+            models.Index(fields = ['release_year', 'type'], name = 'title_block_idx'),
+        ]
+        verbose_name_plural = 'Netflix Titles'
+
+class TitleListing(models.Model):
+    """Slim read model behind the list endpoints, kept in step with Title by write hooks"""
+    title = models.OneToOneField(Title, primary_key = True, on_delete = models.CASCADE, related_name = 'listing')
+    # Copies of the Title columns the list views filter and sort on
+    sort_title = models.CharField(max_length = 255, db_index = True)
+    type = models.CharField(max_length = 20, db_index = True)
+    release_year = models.IntegerField(db_index = True)
+    date_added = models.DateField(null = True, blank = True, db_index = True)
+    listed_in = models.TextField()
+    # Precomputed derived fields
+    genres = models.JSONField(default = list)
+    cast_count = models.IntegerField(default = 0)
+    duration_minutes = models.IntegerField(null = True, blank = True)
+    duration_seasons = models.IntegerField(null = True, blank = True)
+    # Pre-rendered TitleListSerializer output, returned as-is by the list views
+    payload = models.JSONField()
+
+    def __str__(self):
+        return self.sort_title
+
+    class Meta:
+        ordering = ['sort_title', 'pk']
+
+class TitleFacet(models.Model):
+    """Distinct values and row counts of a filterable Title column, maintained from Title writes"""
+    FIELDS = ['type', 'rating', 'release_year']
+
+    field = models.CharField(max_length = 20)
+    value = models.CharField(max_length = 20)
+    count = models.IntegerField(default = 0)
+
+    def __str__(self):
+        return f"{self.field}={self.value}: {self.count}"
+
+    class Meta:
+        ordering = ['field', 'value']
+        constraints = [
+            models.UniqueConstraint(fields = ['field', 'value'], name = 'unique_title_facet'),
+        ]
+
+class TitleAdditionRollup(models.Model):
+    """Titles added per week/month/year, by type and genre ('' means all), maintained from Title writes"""
+    GRANULARITIES = ['week', 'month', 'year']
+
+    granularity = models.CharField(max_length = 5)
+    period = models.DateField()  # First day of the week (Monday), month or year
+    type = models.CharField(max_length = 20, blank = True)
+    genre = models.CharField(max_length = 100, blank = True)
+    count = models.IntegerField(default = 0)
+
+    def __str__(self):
+        return f"{self.granularity} {self.period} {self.type or '*'}/{self.genre or '*'}: {self.count}"
+
+    class Meta:
+        ordering = ['period']
+        constraints = [
+            models.UniqueConstraint(fields = ['granularity', 'type', 'genre', 'period'], name = 'unique_addition_rollup'),
+        ]
+
+class TitleChange(models.Model):
+    """Append-only change log for the delta-sync feed; deletes are kept as tombstones"""
+    seq = models.BigAutoField(primary_key = True)  # Monotonically increasing change sequence
+    title_id = models.BigIntegerField(db_index = True)  # Not a foreign key, so tombstones outlive the title
+    show_id = models.CharField(max_length = 20)
+    deleted = models.BooleanField(default = False)
+    changed_at = models.DateTimeField(auto_now_add = True)
+
+    def __str__(self):
+        return f"#{self.seq} {'delete' if self.deleted else 'upsert'} {self.show_id}"
+
+    class Meta:
+        ordering = ['seq']
+
+
+class Job(models.Model):
+    """Background job (import or rebuild) queued for the run_jobs worker"""
+    QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+    STATUSES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (SUCCEEDED, 'Succeeded'), (FAILED, 'Failed')]
+    ACTIVE = [QUEUED, RUNNING]
+
+    kind = models.CharField(max_length = 50)
+    params = models.JSONField(default = dict, blank = True)
+    status = models.CharField(max_length = 10, choices = STATUSES, default = QUEUED)
+    # Jobs sharing a key never run side by side (see the constraint below)
+    dedupe_key = models.CharField(max_length = 100)
+    attempts = models.IntegerField(default = 0)
+    worker = models.CharField(max_length = 100, blank = True)
+    # Progress, reported by the job while it runs
+    done = models.BigIntegerField(default = 0)
+    total = models.BigIntegerField(null = True, blank = True)
+    rate = models.FloatField(null = True, blank = True)  # Rows per second in the current attempt
+    message = models.CharField(max_length = 255, blank = True)
+    checkpoint = models.JSONField(default = dict, blank = True)  # Where a retried attempt resumes
+    error = models.TextField(blank = True)
+    created_at = models.DateTimeField(auto_now_add = True)
+    run_after = models.DateTimeField(null = True, blank = True)  # Not claimed before this time
+    started_at = models.DateTimeField(null = True, blank = True)
+    heartbeat_at = models.DateTimeField(null = True, blank = True)
+    finished_at = models.DateTimeField(null = True, blank = True)
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind} ({self.status})"
+
+    @property
+    def eta_seconds(self):
+        """Seconds left at the current rate, or None if unknown"""
+        if self.status != self.RUNNING or not self.rate or self.total is None:
+            return None
+        return max(self.total - self.done, 0) / self.rate
+
+    class Meta:
+        ordering = ['pk']
+        constraints = [
+            models.UniqueConstraint(
+                fields = ['dedupe_key'], condition = models.Q(status__in = ['queued', 'running']),
+                name = 'unique_active_job',
+            ),
+        ]
@@ -0,0 +1,91 @@
+"""
+Plain-Python parsing helpers for Netflix title data.
+
+Nothing in here touches Django, so these functions can run in the importer's
+worker processes as well as in request handlers.
+"""
+
+import time
+from datetime import date
+
+MONTHS = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
+    'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12,
+}
+
+# Comma-separated text columns that hold lists of names
+LIST_FIELDS = ['director', 'cast', 'country', 'listed_in']
+
+
+def split_list(value):
+    """Split a comma-separated column into a list of stripped, non-empty names"""
+
+    if not value:
+        return []
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def parse_date_added(value):
+    """Parse 'September 25, 2021' into a date (None for blank, ValueError if malformed)"""
+
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        month_name, day, year = value.replace(',', ' ').split()
+        return date(int(year), MONTHS[month_name.lower()], int(day))
+    except (KeyError, ValueError):
+        raise ValueError(f"Could not parse date '{value}'")
+
+
+def parse_duration(value):
+    """Parse '90 min' / '2 Seasons' into (minutes, seasons); unknown parts are None"""
+
+    parts = (value or '').split()
+    if len(parts) != 2 or not parts[0].isdigit():
+        return None, None
+    amount, unit = int(parts[0]), parts[1].lower()
+    if unit == 'min':
+        return amount, None
+    if unit in ('season', 'seasons'):
+        return None, amount
+    return None, None
+
+
+def normalize_row(row):
+    """Turn one raw CSV row into the field values of a Title (raises ValueError)"""
+
+    values = {key: (value or '').strip() for key, value in row.items() if key}
+    for field in LIST_FIELDS:
+        values[field] = ', '.join(split_list(values.get(field)))
+    values['date_added'] = parse_date_added(values.get('date_added'))
+
+    minutes, seasons = parse_duration(values.get('duration'))
+    if minutes is not None:
+        values['duration'] = f'{minutes} min'
+    elif seasons is not None:
+        values['duration'] = f"{seasons} Season{'s' if seasons != 1 else ''}"
+
+    # Optional columns are stored as NULL rather than empty strings
+    for field in ['director', 'cast', 'country', 'rating', 'duration', 'date_added']:
+        if values.get(field) in ('', None):
+            values[field] = None
+    return values
+
+
+def parse_chunk(chunk):
+    """
+    Normalize a chunk of (line_no, raw_row) pairs.
+
+    Returns (parsed, rejects, seconds) where parsed holds (line_no, raw_row, values)
+    and rejects holds (line_no, raw_row, errors).
+    """
+
+    started = time.perf_counter()
+    parsed, rejects = [], []
+    for line_no, row in chunk:
+        try:
+            parsed.append((line_no, row, normalize_row(row)))
+        except ValueError as exc:
+            rejects.append((line_no, row, {'date_added': [str(exc)]}))
+    return parsed, rejects, time.perf_counter() - started
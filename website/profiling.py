@@ -0,0 +1,186 @@
+"""
+Opt-in memory profiling of the API views.
+
+ProfilingMiddleware (website/middleware.py) profiles a request to a view in
+website/views.py when a staff user sends an X-Profile header, or at random
+with probability PROFILING_SAMPLE_RATE. A profile records the tracemalloc
+peak, where the memory held near that peak was allocated, the model
+instances created and the queries run. The newest PROFILING_BUFFER_SIZE
+profiles are kept in memory and served by /api/profiling/.
+
+tracemalloc traces the whole process, so only one request is profiled at a
+time; requests that would be profiled while another one is are served as
+usual.
+"""
+
+import os
+import sysconfig
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from contextlib import ExitStack
+from itertools import count
+from django.conf import settings
+from django.db import connection
+from django.db.models.signals import post_init
+from django.utils import timezone
+
+# Stack depth recorded per allocation, so it can be traced back to a view line
+TRACE_FRAMES = 25
+# How often traced memory is checked for a new high while a request runs
+SAMPLE_INTERVAL = 0.005
+HOT_SPOTS = 10
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+STDLIB_DIR = sysconfig.get_paths()['stdlib']
+# Frames in these files only pass the request along; allocations are not attributed to them
+PASS_THROUGH = {os.path.join(PACKAGE_DIR, 'middleware.py'), os.path.join(PACKAGE_DIR, 'profiling.py')}
+
+_profiles = deque(maxlen=settings.PROFILING_BUFFER_SIZE)
+_profiles_lock = threading.Lock()
+_ids = count(1)
+# Held while a request is being profiled
+profiling_lock = threading.Lock()
+
+
+def record_profile(profile):
+    profile['id'] = next(_ids)
+    with _profiles_lock:
+        _profiles.append(profile)
+    return profile
+
+
+def recent_profiles():
+    """Buffered profiles, newest first"""
+    with _profiles_lock:
+        return list(reversed(_profiles))
+
+
+def clear_profiles():
+    with _profiles_lock:
+        _profiles.clear()
+
+
+def _location(frame):
+    filename = frame.filename
+    if filename.startswith(PACKAGE_DIR):
+        filename = os.path.relpath(filename, os.path.dirname(PACKAGE_DIR))
+    elif 'site-packages' in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[1]
+    elif filename.startswith(STDLIB_DIR):
+        filename = os.path.relpath(filename, STDLIB_DIR)
+    return f'{filename}:{frame.lineno}'
+
+
+def _origin(traceback):
+    """The innermost project line that led to an allocation, else the allocating line"""
+
+    for frame in reversed(traceback):
+        if frame.filename.startswith(PACKAGE_DIR) and frame.filename not in PASS_THROUGH:
+            return _location(frame)
+    return _location(traceback[-1])
+
+
+def hot_spots(snapshot, limit=HOT_SPOTS):
+    """Largest allocation sites in a snapshot, grouped by the project line responsible"""
+
+    sizes, blocks = Counter(), Counter()
+    for trace in snapshot.traces:
+        origin = _origin(trace.traceback)
+        sizes[origin] += trace.size
+        blocks[origin] += 1
+    return [
+        {'location': origin, 'size_kb': round(size / 1024, 1), 'blocks': blocks[origin]}
+        for origin, size in sizes.most_common(limit)
+    ]
+
+
+class _PeakSampler(threading.Thread):
+    """Takes a snapshot each time traced memory reaches a new high (by at least 10%)"""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.done = threading.Event()
+        self.snapshot = None
+        self.size = 0
+
+    def run(self):
+        while not self.done.wait(SAMPLE_INTERVAL):
+            current, _ = tracemalloc.get_traced_memory()
+            if current > self.size * 1.1:
+                self.snapshot = tracemalloc.take_snapshot()
+                self.size = current
+
+
+class RequestProfile:
+    """Profiles the code run inside a with block on this thread; results end up in .result"""
+
+    def __enter__(self):
+        self.started_tracing = not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start(TRACE_FRAMES)
+        tracemalloc.reset_peak()
+        self.baseline, _ = tracemalloc.get_traced_memory()
+
+        self.thread = threading.get_ident()
+        self.instances = Counter()
+        self.queries = 0
+        post_init.connect(self._count_instance, weak=False)
+        self.stack = ExitStack()
+        self.stack.enter_context(connection.execute_wrapper(self._count_query))
+
+        self.sampler = _PeakSampler()
+        self.sampler.start()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.started
+        self.sampler.done.set()
+        self.sampler.join()
+        current, peak = tracemalloc.get_traced_memory()
+        # The snapshot taken nearest the peak says what was holding the memory
+        if self.sampler.snapshot is not None and self.sampler.size >= current:
+            snapshot = self.sampler.snapshot
+        else:
+            snapshot = tracemalloc.take_snapshot()
+        if self.started_tracing:
+            tracemalloc.stop()
+        self.stack.close()
+        post_init.disconnect(self._count_instance)
+
+        self.result = {
+            'at': timezone.now().isoformat(),
+            'duration_ms': round(elapsed * 1000, 2),
+            'peak_kb': round((peak - self.baseline) / 1024, 1),
+            'retained_kb': round((current - self.baseline) / 1024, 1),
+            'queries': self.queries,
+            'instances': sum(self.instances.values()),
+            'instances_by_model': dict(self.instances.most_common()),
+            'hot_spots': hot_spots(snapshot),
+        }
+        return False
+
+    def _count_instance(self, sender, **kwargs):
+        if threading.get_ident() == self.thread:
+            self.instances[sender.__name__] += 1
+
+    def _count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+def summarize(profiles):
+    """Per-view request count and peak memory / instance figures"""
+
+    views = {}
+    for profile in profiles:
+        entry = views.setdefault(profile['view'], {'requests': 0, 'max_peak_kb': 0, 'total_peak_kb': 0, 'max_instances': 0})
+        entry['requests'] += 1
+        entry['max_peak_kb'] = max(entry['max_peak_kb'], profile['peak_kb'])
+        entry['total_peak_kb'] += profile['peak_kb']
+        entry['max_instances'] = max(entry['max_instances'], profile['instances'])
+    for entry in views.values():
+        entry['avg_peak_kb'] = round(entry.pop('total_peak_kb') / entry['requests'], 1)
+    return views
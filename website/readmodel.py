@@ -0,0 +1,63 @@
+from django.db import transaction
+from .models import Title, TitleListing
+from .parsing import split_list, parse_duration
+from .serializers import TitleListSerializer
+
+# TitleListing columns rewritten on every refresh (everything except the key)
+LISTING_FIELDS = [
+    'sort_title', 'type', 'release_year', 'date_added', 'listed_in',
+    'genres', 'cast_count', 'duration_minutes', 'duration_seasons', 'payload',
+]
+
+
+def build_listing(title):
+    """Build the (unsaved) TitleListing row for a title"""
+
+    minutes, seasons = parse_duration(title.duration)
+    return TitleListing(
+        title_id=title.pk,
+        sort_title=title.title,
+        type=title.type,
+        release_year=title.release_year,
+        date_added=title.date_added,
+        listed_in=title.listed_in,
+        genres=split_list(title.listed_in),
+        cast_count=len(split_list(title.cast)),
+        duration_minutes=minutes,
+        duration_seasons=seasons,
+        payload=dict(TitleListSerializer(title).data),
+    )
+
+
+def save_listings(titles):
+    """Insert or refresh the listings for already loaded titles"""
+
+    TitleListing.objects.bulk_create(
+        [build_listing(title) for title in titles],
+        update_conflicts=True,
+        unique_fields=['title'],
+        update_fields=LISTING_FIELDS,
+        batch_size=500,
+    )
+
+
+def refresh_listings(pks):
+    """Refresh the listings for the given title ids (used after bulk writes)"""
+
+    save_listings(Title.objects.filter(pk__in=pks))
+
+
+def rebuild_listings():
+    """Recreate every listing from the Title table"""
+
+    with transaction.atomic():
+        TitleListing.objects.all().delete()
+        batch = []
+        for title in Title.objects.order_by().iterator(chunk_size=2000):
+            batch.append(title)
+            if len(batch) >= 2000:
+                save_listings(batch)
+                batch = []
+        if batch:
+            save_listings(batch)
+    return TitleListing.objects.count()
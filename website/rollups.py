@@ -0,0 +1,74 @@
+from collections import Counter
+from datetime import date, timedelta
+from django.db import transaction
+from django.db.models import F
+from .models import Title, TitleAdditionRollup
+from .parsing import split_list
+
+# Title columns the rollups are derived from
+ROLLUP_FIELDS = ['type', 'date_added', 'listed_in']
+
+
+def period_start(granularity, day):
+    """First day of the week (Monday), month or year containing day"""
+
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return date(day.year, 1, 1)
+
+
+def rollup_keys(values):
+    """Every (granularity, period, type, genre) bucket one title counts towards"""
+
+    if not values or not values.get('date_added'):
+        return []
+    # An unsaved instance can still hold the string it was created with
+    day = Title._meta.get_field('date_added').to_python(values['date_added'])
+    types = ['', values['type']]
+    genres = [''] + list(dict.fromkeys(split_list(values.get('listed_in'))))
+    return [
+        (granularity, period_start(granularity, day), title_type, genre)
+        for granularity in TitleAdditionRollup.GRANULARITIES
+        for title_type in types
+        for genre in genres
+    ]
+
+
+def apply_title_change(old_values, new_values):
+    """Move one title's contribution from its old buckets to its new ones"""
+
+    delta = Counter(rollup_keys(new_values))
+    delta.subtract(rollup_keys(old_values))
+
+    with transaction.atomic():
+        for (granularity, period, title_type, genre), change in delta.items():
+            if not change:
+                continue
+            updated = TitleAdditionRollup.objects.filter(
+                granularity=granularity, period=period, type=title_type, genre=genre,
+            ).update(count=F('count') + change)
+            if not updated:
+                TitleAdditionRollup.objects.create(
+                    granularity=granularity, period=period, type=title_type, genre=genre, count=change,
+                )
+
+
+def rebuild_rollups():
+    """Recompute every rollup from the Title table (used after bulk imports)"""
+
+    counts = Counter()
+    for values in Title.objects.filter(date_added__isnull=False).values(*ROLLUP_FIELDS).iterator(chunk_size=2000):
+        counts.update(rollup_keys(values))
+
+    with transaction.atomic():
+        TitleAdditionRollup.objects.all().delete()
+        TitleAdditionRollup.objects.bulk_create(
+            [
+                TitleAdditionRollup(granularity=granularity, period=period, type=title_type, genre=genre, count=count)
+                for (granularity, period, title_type, genre), count in counts.items()
+            ],
+            batch_size=2000,
+        )
+    return len(counts)
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Title
+from .models import Title, Job
 
 class TitleSerializer(serializers.ModelSerializer):
     """Serializer for the Title model with all fields"""
@@ -7,6 +7,7 @@ class TitleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Title
         fields = '__all__'
+        read_only_fields = ['version']
         
     def validate_release_year(self, value):
         """Check that release year is reasonable (between 1900 and current year + 5)"""
@@ -26,12 +27,19 @@ class TitleListSerializer(serializers.ModelSerializer):
         model = Title
         fields = ['id', 'show_id', 'type', 'title', 'release_year', 'rating', 'duration', 'listed_in']
 
+class TitleListingSerializer(serializers.BaseSerializer):
+    """Read-only serializer for TitleListing rows, which store their TitleListSerializer output"""
+
+    def to_representation(self, instance):
+        return instance.payload
+
 class TitleCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating new titles with validation"""
     
     class Meta:
         model = Title
         fields = '__all__'
+        read_only_fields = ['version']
         
     def validate_show_id(self, value):
         """Check that show_id is unique"""
@@ -57,6 +65,15 @@ class TitleCreateSerializer(serializers.ModelSerializer):
             )
         return value
 
+class TitleImportSerializer(TitleCreateSerializer):
+    """Create-time validation rules for rows loaded by load_netflix_data (known show_ids are updated, not rejected)"""
+
+    class Meta(TitleCreateSerializer.Meta):
+        extra_kwargs = {'show_id': {'validators': []}}
+
+    def validate_show_id(self, value):
+        return value
+
 class TitleDetailSerializer(serializers.ModelSerializer):
     """Detailed serializer with additional computed fields"""
     
@@ -66,6 +83,7 @@ class TitleDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Title
         fields = '__all__'
+        read_only_fields = ['version']
         
     def get_cast_count(self, obj):
         """Count the number of cast members"""
@@ -80,3 +98,42 @@ class TitleDetailSerializer(serializers.ModelSerializer):
         if obj.listed_in:
             return [genre.strip() for genre in obj.listed_in.split(',') if genre.strip()]
         return []
+
+class JobSerializer(serializers.ModelSerializer):
+    """Background job with its progress, throughput (rows per second) and ETA"""
+
+    percent = serializers.SerializerMethodField()
+    eta_seconds = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'params', 'status', 'attempts', 'done', 'total', 'percent', 'rate', 'eta_seconds',
+            'message', 'error', 'created_at', 'run_after', 'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
+
+    def get_percent(self, obj):
+        if not obj.total:
+            return None
+        return round(min(obj.done / obj.total, 1) * 100, 1)
+
+class JobCreateSerializer(serializers.Serializer):
+    """Body of POST /api/jobs/"""
+
+    kind = serializers.CharField()
+    params = serializers.DictField(required=False, default=dict)
+
+    def validate_kind(self, value):
+        from .jobs import HANDLERS
+        if value not in HANDLERS:
+            raise serializers.ValidationError(f"Must be one of: {', '.join(sorted(HANDLERS))}")
+        return value
+
+    def validate(self, data):
+        from .jobs import clean_params
+        try:
+            data['params'] = clean_params(data['kind'], data['params'])
+        except ValueError as exc:
+            raise serializers.ValidationError({'params': str(exc)})
+        return data
@@ -0,0 +1,84 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver, Signal
+from .models import Title
+from .cache import invalidate_title_details
+from .rollups import ROLLUP_FIELDS, apply_title_change
+from .facets import FACET_FIELDS, apply_facet_change
+from .readmodel import save_listings, refresh_listings
+from .changes import record_changes, record_changes_for, record_deletion
+from .snapshots import schedule_snapshot
+
+# Sent by bulk writers (the importer) after a batch of titles is committed,
+# since bulk_create() does not send post_save. Provides pks=[...].
+titles_bulk_written = Signal()
+
+# Stored values the write hooks compare against
+TRACKED_FIELDS = list(dict.fromkeys(ROLLUP_FIELDS + FACET_FIELDS))
+
+
+def _values(instance, fields):
+    return {field: getattr(instance, field) for field in fields}
+
+
+def _load_stored_values(instance, fields=TRACKED_FIELDS):
+    """Fetch any stored values the write hooks need that were not loaded with the instance"""
+
+    stored = instance.stored_values
+    missing = [field for field in fields if field not in stored]
+    if missing:
+        row = Title.objects.filter(pk=instance.pk).values(*missing).first()
+        if row:
+            instance._loaded_values = {**stored, **row}
+
+
+@receiver(pre_save, sender=Title)
+def title_saving(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    _load_stored_values(instance)
+
+
+@receiver(pre_delete, sender=Title)
+def title_deleting(sender, instance, **kwargs):
+    # The row is gone by post_delete, so deferred values have to be read now
+    _load_stored_values(instance, TRACKED_FIELDS + ['show_id'])
+
+
+@receiver(post_save, sender=Title)
+def title_saved(sender, instance, created, raw=False, **kwargs):
+    """Keep derived data in step with a single title write (API, admin or importer)"""
+
+    invalidate_title_details([instance.pk])
+    if raw:
+        return
+
+    old = None if created else instance.stored_values
+    new = _values(instance, TRACKED_FIELDS)
+    apply_title_change(old, new)
+    apply_facet_change(old, new)
+    save_listings([instance])
+    record_changes([(instance.pk, instance.show_id)])
+    transaction.on_commit(schedule_snapshot)
+
+
+@receiver(post_delete, sender=Title)
+def title_deleted(sender, instance, **kwargs):
+    """Keep derived data in step with a single title delete (the listing row cascades)"""
+
+    invalidate_title_details([instance.pk])
+    old = instance.stored_values or _values(instance, TRACKED_FIELDS + ['show_id'])
+    apply_title_change(old, None)
+    apply_facet_change(old, None)
+    record_deletion(instance.pk, old['show_id'])
+    transaction.on_commit(schedule_snapshot)
+
+
+@receiver(titles_bulk_written)
+def titles_bulk_saved(sender, pks, **kwargs):
+    """Keep derived data in step with a committed batch of title writes"""
+
+    invalidate_title_details(pks)
+    refresh_listings(pks)
+    record_changes_for(pks)
+    transaction.on_commit(schedule_snapshot)
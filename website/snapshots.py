@@ -0,0 +1,146 @@
+"""
+Prebuilt catalog snapshots for first-launch bootstrapping.
+
+A snapshot is the list payload of every title, written once to STATIC_ROOT as
+snapshots/catalog-<version>.json together with .gz and .br variants, so
+WhiteNoise can serve it without touching Django views. The version is the
+change-feed sequence it was built at, so a client that loaded a snapshot can
+continue with /api/titles/changes/?since=<version>.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.utils import timezone
+from .changes import latest_seq
+from .models import TitleListing
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; clients fall back to gzip
+    brotli = None
+
+SNAPSHOT_DIR = 'snapshots'
+# Quality 11 shrinks the catalog about 15% further but takes about 50 times the CPU
+BROTLI_QUALITY = 9
+MANIFEST_NAME = 'manifest.json'
+
+
+def snapshot_root():
+    return os.path.join(settings.STATIC_ROOT, SNAPSHOT_DIR)
+
+
+def snapshot_name(version):
+    return f'catalog-{version}.json'
+
+
+def snapshot_url(name):
+    # Built by hand: snapshots are not part of the collectstatic manifest
+    return f'{settings.STATIC_URL}{SNAPSHOT_DIR}/{name}'
+
+
+def read_manifest():
+    """Return the manifest of the current snapshot, or None if none was built"""
+
+    try:
+        with open(os.path.join(snapshot_root(), MANIFEST_NAME), encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def _write_atomic(path, data):
+    # A unique temp name, so two builds running at once never write the same file
+    directory, name = os.path.split(path)
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=f'.{name}.', suffix='.tmp', delete=False) as file:
+        file.write(data)
+    try:
+        os.chmod(file.name, 0o644)
+        os.replace(file.name, path)
+    except BaseException:
+        os.remove(file.name)
+        raise
+
+
+def build_snapshot(keep=3, force=False):
+    """Write the snapshot for the current catalog version and point the manifest at it"""
+
+    root = snapshot_root()
+    os.makedirs(root, exist_ok=True)
+
+    # Read the version before the titles: a write landing in between is then
+    # replayed by the change feed rather than lost
+    version = latest_seq()
+    name = snapshot_name(version)
+    path = os.path.join(root, name)
+    manifest = read_manifest()
+    if not force and manifest and manifest['version'] == version and os.path.exists(path):
+        return manifest
+
+    titles = TitleListing.objects.values_list('payload', flat=True).order_by('sort_title', 'pk')
+    body = json.dumps(
+        {'version': version, 'titles': list(titles.iterator(chunk_size=2000))},
+        separators=(',', ':'), default=str,
+    ).encode('utf-8')
+
+    # Compressed variants first, so WhiteNoise never sees the .json without them
+    _write_atomic(f'{path}.gz', gzip.compress(body, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _write_atomic(f'{path}.br', brotli.compress(body, quality=BROTLI_QUALITY))
+    _write_atomic(path, body)
+
+    manifest = {
+        'version': version,
+        'url': snapshot_url(name),
+        'sha256': hashlib.sha256(body).hexdigest(),
+        'size': len(body),
+        'gzip_size': os.path.getsize(f'{path}.gz'),
+        'brotli_size': os.path.getsize(f'{path}.br') if brotli is not None else None,
+        'generated_at': timezone.now().isoformat(),
+    }
+    _write_atomic(os.path.join(root, MANIFEST_NAME), json.dumps(manifest).encode('utf-8'))
+
+    _remove_old_snapshots(root, keep)
+    return manifest
+
+
+def _remove_old_snapshots(root, keep):
+    versions = sorted(
+        int(entry[len('catalog-'):-len('.json')])
+        for entry in os.listdir(root)
+        if entry.startswith('catalog-') and entry.endswith('.json')
+    )
+    for version in versions[:-max(keep, 1)]:
+        for suffix in ('', '.gz', '.br'):
+            try:
+                os.remove(os.path.join(root, snapshot_name(version) + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def schedule_snapshot():
+    """
+    Queue a snapshot build for CATALOG_SNAPSHOT_DEBOUNCE seconds after the first of a run of writes.
+
+    The build runs as a build_catalog_snapshot job in the run_jobs worker, not
+    in the web process. Writes fall into windows of that length; every write
+    in a window shares one job, due when the window ends, so later writes in
+    the window are picked up by the same build. A write landing while that
+    build runs belongs to the next window and queues the next build.
+    """
+
+    from .jobs import enqueue
+
+    delay = getattr(settings, 'CATALOG_SNAPSHOT_DEBOUNCE', None)
+    if delay is None:
+        return
+    window = int(time.time() // delay) + 1
+    enqueue(
+        'build_catalog_snapshot', dedupe_key=f'build_catalog_snapshot:{window}',
+        run_after=datetime.fromtimestamp(window * delay, tz=dt_timezone.utc),
+    )
@@ -1,10 +1,64 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
-from datetime import datetime, date
-from .models import Title
-from .serializers import TitleSerializer, TitleCreateSerializer
+from datetime import datetime, date, timezone
+from unittest import mock
+import csv
+import gzip
+import json
+import multiprocessing
+import threading
+import time
+import tracemalloc
+import os
+import sqlite3
+import tempfile
+from io import StringIO
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from collections import deque
+from django.db import connection
+from django.conf import settings
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from .models import Title, TitleAdditionRollup, TitleListing, TitleChange, TitleFacet, Job
+from .serializers import TitleSerializer, TitleCreateSerializer, TitleListSerializer
+from .cache import clear_title_details, single_flight
+from .throttles import StatsRateThrottle
+from .rollups import rebuild_rollups
+from .facets import facet_values, rebuild_facets
+from .jobs import enqueue, claim_next, run_job, HANDLERS
+from . import batch
+from .duplicates import block_index
+from .changes import record_changes
+from .profiling import recent_profiles, clear_profiles, profiling_lock
+from .snapshots import read_manifest
+from .graph import get_graph, published_version
+
+_cache_dir = None
+_cache_settings = None
+
+
+def setUpModule():
+    # Every title write drops cached payloads, so point the shared file cache at
+    # a scratch directory instead of the one a dev server uses
+    global _cache_dir, _cache_settings
+    _cache_dir = tempfile.TemporaryDirectory()
+    _cache_settings = override_settings(CACHES={
+        **settings.CACHES,
+        'titles': {**settings.CACHES['titles'], 'LOCATION': os.path.join(_cache_dir.name, 'title-detail')},
+        'shared': {**settings.CACHES['shared'], 'LOCATION': os.path.join(_cache_dir.name, 'shared')},
+    })
+    _cache_settings.enable()
+
+
+def tearDownModule():
+    _cache_settings.disable()
+    _cache_dir.cleanup()
+
 
 class TitleModelTest(TestCase):
     "Test the Title model"
@@ -243,7 +297,15 @@ class TitleAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         # Should return titles added in last 30 days
         self.assertIsInstance(response.data, list)
-    
+
+    def test_recent_titles_rejects_out_of_range_days(self):
+        """Test GET /api/titles/recent/?days= - Windows that overflow the date range are a 400"""
+        url = reverse('recent-titles')
+        for days in ('1000000', '1000000000', '-1', 'abc'):
+            response = self.client.get(url, {'days': days})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('days', response.data)
+
     def test_get_title_statistics(self):
         """Test GET /api/titles/stats/ - Get dataset statistics"""
         url = reverse('title-stats')
@@ -330,3 +392,1160 @@ class TitleModelMethodsTest(TestCase):
         titles = Title.objects.all()
         self.assertEqual(titles[0].title, 'ABC Movie')
         self.assertEqual(titles[1].title, 'Test Methods Movie')
+
+class TitleDetailCacheTest(APITestCase):
+    """Test the read-through detail cache and the batch endpoint"""
+
+    def setUp(self):
+        clear_title_details()
+        self.movie = Title.objects.create(
+            show_id='cache1',
+            type='Movie',
+            title='Cached Movie',
+            cast='Actor 1, Actor 2',
+            release_year=2021,
+            rating='PG',
+            listed_in='Drama, Thriller',
+            description='A movie that lives in the cache'
+        )
+        self.show = Title.objects.create(
+            show_id='cache2',
+            type='TV Show',
+            title='Cached Show',
+            release_year=2020,
+            listed_in='Comedy',
+            description='A show that lives in the cache'
+        )
+
+    def test_detail_served_from_cache(self):
+        """Second GET of the same title does not touch the database"""
+        url = reverse('title-detail', kwargs={'pk': self.movie.pk})
+        self.client.get(url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['cast_count'], 2)
+        self.assertEqual(response.data['genres_list'], ['Drama', 'Thriller'])
+
+    def test_update_invalidates_cache(self):
+        """PATCH drops the cached payload so the next GET sees the change"""
+        url = reverse('title-detail', kwargs={'pk': self.movie.pk})
+        self.client.get(url)
+
+        self.client.patch(url, {'rating': 'R'}, format='json')
+        response = self.client.get(url)
+
+        self.assertEqual(response.data['rating'], 'R')
+
+    def test_delete_invalidates_cache(self):
+        """DELETE drops the cached payload so the next GET is a 404"""
+        url = reverse('title-detail', kwargs={'pk': self.movie.pk})
+        self.client.get(url)
+
+        self.client.delete(url)
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalidation_reaches_other_workers(self):
+        """A write drops the payload another worker process cached"""
+        url = reverse('title-detail', kwargs={'pk': self.movie.pk})
+        self.client.get(url)
+        # A second handle on the same cache location stands in for another worker
+        other_worker = caches.create_connection('titles')
+        self.assertIsNotNone(other_worker.get(f'title-detail:{self.movie.pk}'))
+
+        self.movie.rating = 'R'
+        self.movie.save()
+
+        self.assertIsNone(other_worker.get(f'title-detail:{self.movie.pk}'))
+
+    def test_batch_returns_results_in_order(self):
+        """Test GET /api/titles/batch/?ids= - Several titles in one call"""
+        url = reverse('title-batch')
+        response = self.client.get(url, {'ids': f'{self.show.pk},{self.movie.pk},999999'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([t['show_id'] for t in response.data['results']], ['cache2', 'cache1'])
+        self.assertEqual(response.data['missing'], [999999])
+
+    def test_batch_rejects_bad_ids(self):
+        """Test GET /api/titles/batch/ with non-numeric ids"""
+        response = self.client.get(reverse('title-batch'), {'ids': '1,abc'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConditionalUpdateTest(APITestCase):
+    """Test ETag / If-Match versioning and minimal writes on /api/titles/{id}/"""
+
+    def setUp(self):
+        self.title = Title.objects.create(
+            show_id='v1', type='Movie', title='Versioned', cast='A, B', release_year=2020,
+            rating='PG', listed_in='Dramas', description='A long description'
+        )
+        self.url = reverse('title-detail', kwargs={'pk': self.title.pk})
+
+    def test_get_returns_etag(self):
+        """GET sends the version as ETag and answers a matching If-None-Match with 304"""
+        response = self.client.get(self.url)
+        self.assertEqual(response['ETag'], '"1"')
+        self.assertEqual(response.data['version'], 1)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_patch_writes_only_changed_columns(self):
+        """PATCH updates just the changed columns and moves the version on"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, {'rating': 'R', 'title': 'Versioned'}, format='json', HTTP_IF_MATCH='"1"')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['ETag'], '"2"')
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "website_title"')]
+        self.assertEqual(len(updates), 2)  # version claim, then the changed column
+        self.assertIn('"rating"', updates[1])
+        self.assertNotIn('"description"', updates[1])
+        self.assertNotIn('"title" =', updates[1])
+        self.title.refresh_from_db()
+        self.assertEqual((self.title.rating, self.title.version), ('R', 2))
+
+    def test_stale_if_match_is_rejected(self):
+        """A write based on an old version gets 412 and changes nothing"""
+        self.title.rating = 'TV-14'
+        self.title.save()  # Another editor; version 2
+
+        response = self.client.patch(self.url, {'rating': 'R'}, format='json', HTTP_IF_MATCH='"1"')
+
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(response['ETag'], '"2"')
+        self.title.refresh_from_db()
+        self.assertEqual(self.title.rating, 'TV-14')
+
+    def test_stale_instance_save_moves_version_forward(self):
+        """Saving an instance loaded before other writes still bumps the stored version"""
+        stale = Title.objects.get(pk=self.title.pk)
+        self.title.save()
+        self.title.save()  # Stored version is 3 now
+
+        stale.rating = 'R'
+        stale.save()
+
+        self.assertEqual(stale.version, 4)
+        self.assertEqual(Title.objects.get(pk=self.title.pk).version, 4)
+
+    def test_noop_write_skips_database(self):
+        """A PATCH that changes nothing does not write or invalidate anything"""
+        changes = TitleChange.objects.count()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, {'rating': 'PG'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['ETag'], '"1"')
+        self.assertFalse(any(not q['sql'].startswith('SELECT') for q in queries.captured_queries))
+        self.assertEqual(TitleChange.objects.count(), changes)
+
+
+class ExpensiveEndpointTest(APITestCase):
+    """Test throttling and request coalescing on the expensive endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        caches['shared'].clear()
+
+    def test_single_flight_coalesces_concurrent_calls(self):
+        """Concurrent callers of the same key share one computation"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'answer': 42}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(single_flight('coalesce-test', compute)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'answer': 42}] * 5)
+
+    def test_single_flight_coalesces_across_processes(self):
+        """Worker processes share one computation through the shared cache"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            calls_path = os.path.join(tmpdir, 'calls')
+
+            def compute():
+                with open(calls_path, 'a') as file:
+                    file.write('call\n')
+                time.sleep(0.5)
+                return {'answer': 42}
+
+            context = multiprocessing.get_context('fork')
+            results = context.Queue()
+            workers = [
+                context.Process(target=lambda: results.put(single_flight('coalesce-processes', compute)))
+                for _ in range(3)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join(10)
+
+            with open(calls_path) as file:
+                self.assertEqual(len(file.readlines()), 1)
+            self.assertEqual([results.get(timeout=1) for _ in workers], [{'answer': 42}] * 3)
+
+    def test_single_flight_follower_recomputes_when_leader_fails(self):
+        """A failed computation releases its lock, so the next caller runs it again"""
+        with self.assertRaises(RuntimeError):
+            single_flight('failing-flight', mock.Mock(side_effect=RuntimeError('boom')))
+        self.assertEqual(single_flight('failing-flight', lambda: {'answer': 1}), {'answer': 1})
+
+    def test_stats_are_throttled_per_client(self):
+        """Test GET /api/titles/stats/ returns 429 once the client's rate is used up"""
+        url = reverse('title-stats')
+        with mock.patch.object(StatsRateThrottle, 'THROTTLE_RATES', {'stats': '2/min'}):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_stats_recomputed_after_write(self):
+        """Cached stats are keyed on the catalog generation, so writes show up"""
+        url = reverse('title-stats')
+        self.assertEqual(self.client.get(url).data['total_titles'], 0)
+
+        Title.objects.create(show_id='s1', type='Movie', title='Stats Movie',
+                             release_year=2020, listed_in='Drama', description='x')
+
+        self.assertEqual(self.client.get(url).data['total_titles'], 1)
+
+
+class LoadNetflixDataTest(TestCase):
+    """Test the load_netflix_data ingestion pipeline"""
+
+    HEADER = 'show_id,type,title,director,cast,country,date_added,release_year,rating,duration,listed_in,description\n'
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.tmpdir.name, 'titles.csv')
+        self.quarantine_path = os.path.join(self.tmpdir.name, 'quarantine.csv')
+        with open(self.csv_path, 'w', encoding='utf-8') as file:
+            file.write(self.HEADER)
+            file.write('s1,Movie,Good Movie,Dir A,"Actor 1 ,Actor 2",USA," September 25, 2021",2020,PG,90 min,"Dramas, Comedies",Fine\n')
+            file.write('s2,TV Show,Good Show,,,UK,,2019,TV-MA,2 Seasons,Comedies,Fine\n')
+            file.write('s3,Movie,Bad Date,,,,"Smarch 40, 2021",2020,PG,90 min,Dramas,Broken date\n')
+            file.write('s4,Podcast,Bad Type,,,,,2020,PG,90 min,Dramas,Broken type\n')
+        self.addCleanup(self.tmpdir.cleanup)
+        # The importer finishes by writing a catalog snapshot into STATIC_ROOT
+        static_root = override_settings(STATIC_ROOT=self.tmpdir.name)
+        static_root.enable()
+        self.addCleanup(static_root.disable)
+
+    def load(self, **options):
+        call_command('load_netflix_data', file=self.csv_path, quarantine=self.quarantine_path,
+                     stdout=StringIO(), **options)
+
+    def test_valid_rows_are_normalized_and_loaded(self):
+        """Valid rows are written with parsed dates and cleaned-up lists"""
+        self.load(workers=0)
+
+        self.assertEqual(Title.objects.count(), 2)
+        movie = Title.objects.get(show_id='s1')
+        self.assertEqual(movie.date_added, date(2021, 9, 25))
+        self.assertEqual(movie.cast, 'Actor 1, Actor 2')
+        self.assertIsNone(Title.objects.get(show_id='s2').director)
+
+    def test_invalid_rows_are_quarantined(self):
+        """Rows with a malformed date or an invalid type go to the quarantine file"""
+        self.load(workers=0)
+
+        with open(self.quarantine_path, encoding='utf-8') as file:
+            rejected = file.read()
+        self.assertIn('Bad Date', rejected)
+        self.assertIn('Bad Type', rejected)
+        self.assertNotIn('Good Movie', rejected)
+
+    def test_reload_updates_existing_titles_with_process_pool(self):
+        """Running the import twice (through worker processes) updates rather than duplicates"""
+        Title.objects.create(show_id='s1', type='Movie', title='Old Name',
+                             release_year=2020, listed_in='Dramas', description='Old')
+
+        self.load(workers=1)
+
+        self.assertEqual(Title.objects.count(), 2)
+        self.assertEqual(Title.objects.get(show_id='s1').title, 'Good Movie')
+
+    def test_reload_skips_unchanged_rows(self):
+        """Re-importing identical rows writes nothing, so versions (ETags) and the change feed stay put"""
+        self.load(workers=0)
+        changes = TitleChange.objects.count()
+        with open(self.csv_path, 'a', encoding='utf-8') as file:
+            file.write('s5,Movie,Added Later,,,,,2021,PG,90 min,Dramas,New\n')
+
+        self.load(workers=0)
+
+        self.assertEqual(dict(Title.objects.values_list('show_id', 'version')), {'s1': 1, 's2': 1, 's5': 1})
+        self.assertEqual(TitleChange.objects.count(), changes + 1)
+
+
+class JobQueueTest(APITestCase):
+    """Test the background job queue, the run_jobs worker and /api/jobs/"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.csv_path = os.path.join(self.tmpdir.name, 'titles.csv')
+        with open(self.csv_path, 'w', encoding='utf-8') as file:
+            file.write(LoadNetflixDataTest.HEADER)
+            file.write('j1,Movie,First,,,,,2020,PG,90 min,Dramas,x\n')
+            file.write('j2,Movie,Second,,,,,2020,PG,90 min,Dramas,x\n')
+            file.write('j3,Podcast,Rejected,,,,,2020,PG,90 min,Dramas,x\n')
+            file.write('j4,TV Show,Fourth,,,,,2021,TV-MA,1 Season,Comedies,x\n')
+        self.params = {
+            'file': self.csv_path, 'quarantine': os.path.join(self.tmpdir.name, 'quarantine.csv'),
+            'workers': 0, 'batch_size': 1,
+        }
+        dirs = override_settings(STATIC_ROOT=self.tmpdir.name, JOB_DATA_DIR=self.tmpdir.name)
+        dirs.enable()
+        self.addCleanup(dirs.disable)
+
+    def test_enqueue_dedupes_active_jobs(self):
+        """A second rebuild of the same kind returns the job already queued"""
+        job, created = enqueue('rebuild_read_models')
+        again, created_again = enqueue('rebuild_read_models')
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again.pk, job.pk)
+
+        run_job(claim_next('test'))
+        self.assertTrue(enqueue('rebuild_read_models')[1])
+
+    def test_import_job_reports_progress(self):
+        """An import job loads the file and records rows done, total and a checkpoint"""
+        enqueue('import_titles', self.params)
+        call_command('run_jobs', once=True, stdout=StringIO())
+
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual((job.done, job.total), (4, 4))
+        self.assertEqual(job.checkpoint, {'line': 5})
+        self.assertEqual(Title.objects.count(), 3)
+
+    def test_import_resumes_after_crash(self):
+        """A job whose worker died is requeued and skips the rows it already committed"""
+        enqueue('import_titles', self.params)
+        Job.objects.update(
+            status=Job.RUNNING, attempts=1, done=1, checkpoint={'line': 2},
+            heartbeat_at=datetime(2020, 1, 1, tzinfo=timezone.utc),
+        )
+
+        job = run_job(claim_next('test'))
+
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(job.done, 4)
+        self.assertEqual(sorted(Title.objects.values_list('show_id', flat=True)), ['j2', 'j4'])
+
+    def test_resumed_import_does_not_repeat_quarantined_rows(self):
+        """Rows rejected after the checkpoint are quarantined once, not again by the retry"""
+        with open(self.params['quarantine'], 'w', encoding='utf-8', newline='') as file:
+            file.write('line,show_id,type,title,director,cast,country,date_added,release_year,'
+                       'rating,duration,listed_in,description,errors\n')
+            file.write('1,j0,Podcast,Earlier,,,,,2020,PG,90 min,Dramas,x,{}\n')
+            file.write('4,j3,Podcast,Rejected,,,,,2020,PG,90 min,Dramas,x,{}\n')
+        enqueue('import_titles', self.params)
+        Job.objects.update(
+            status=Job.RUNNING, attempts=1, done=1, checkpoint={'line': 2},
+            heartbeat_at=datetime(2020, 1, 1, tzinfo=timezone.utc),
+        )
+
+        run_job(claim_next('test'))
+
+        with open(self.params['quarantine'], encoding='utf-8', newline='') as file:
+            self.assertEqual([row[:2] for row in csv.reader(file)], [['line', 'show_id'], ['1', 'j0'], ['4', 'j3']])
+
+    def test_snapshot_job_compacts_change_log(self):
+        """Building the snapshot also drops superseded change feed entries"""
+        title = Title.objects.create(show_id='c1', type='Movie', title='Draft', release_year=2020, description='x')
+        title.title = 'Final'
+        title.save()
+        self.assertEqual(TitleChange.objects.count(), 2)
+
+        enqueue('build_catalog_snapshot')
+        job = run_job(claim_next('test'))
+
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(TitleChange.objects.count(), 1)
+
+    def test_failed_job_records_error(self):
+        """An exception in a handler marks the job failed with the traceback"""
+        job, _ = enqueue('rebuild_search_index')
+        with mock.patch.dict(HANDLERS, {'rebuild_search_index': mock.Mock(side_effect=RuntimeError('boom'))}):
+            job = run_job(claim_next('test'))
+
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('RuntimeError: boom', job.error)
+
+    def test_jobs_api(self):
+        """Staff can queue jobs and read their progress; others cannot"""
+        url = reverse('job-create')
+        self.assertEqual(self.client.post(url, {'kind': 'rebuild_read_models'}, format='json').status_code, 403)
+
+        self.client.force_authenticate(User.objects.create_user('staff', is_staff=True))
+        response = self.client.post(url, {'kind': 'rebuild_read_models'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        repeat = self.client.post(url, {'kind': 'rebuild_read_models'}, format='json')
+        self.assertEqual(repeat.status_code, status.HTTP_200_OK)
+        self.assertEqual(repeat.data['id'], response.data['id'])
+        self.assertEqual(self.client.post(url, {'kind': 'nope'}, format='json').status_code, 400)
+
+        run_job(claim_next('test'))
+        detail = self.client.get(reverse('job-detail', args=[response.data['id']]))
+        self.assertEqual(detail.data['status'], 'succeeded')
+        self.assertEqual(detail.data['percent'], 100.0)
+        self.assertIn('eta_seconds', detail.data)
+
+    def test_api_rejects_unsafe_params(self):
+        """Only known params are accepted, and import files must be inside the data directory"""
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        url = reverse('job-create')
+        outside = tempfile.NamedTemporaryFile(delete=False)
+        outside.close()
+        self.addCleanup(os.remove, outside.name)
+        for params in [
+            {'file': outside.name},
+            {'quarantine': os.path.join(self.tmpdir.name, '..', 'quarantine.csv')},
+            {'file': self.csv_path, 'quarantine': self.csv_path},
+            {'workers': -1},
+            {'resume_after_line': 10},
+        ]:
+            response = self.client.post(url, {'kind': 'import_titles', 'params': params}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertIn('params', response.data)
+        self.assertFalse(Job.objects.exists())
+
+        response = self.client.post(url, {'kind': 'import_titles', 'params': self.params}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_worker_rechecks_params(self):
+        """A job stored with a path outside the data directory fails without touching the file"""
+        outside = tempfile.NamedTemporaryFile('w', delete=False)
+        outside.write('keep me')
+        outside.close()
+        self.addCleanup(os.remove, outside.name)
+        Job.objects.create(kind='import_titles', params={**self.params, 'quarantine': outside.name},
+                           dedupe_key='import_titles')
+
+        job = run_job(claim_next('test'))
+
+        self.assertEqual(job.status, Job.FAILED)
+        with open(outside.name, encoding='utf-8') as file:
+            self.assertEqual(file.read(), 'keep me')
+
+
+class BatchEndpointTest(APITestCase):
+    """Test POST /api/batch/ - several read-only calls in one request"""
+
+    def setUp(self):
+        Title.objects.create(show_id='b1', type='Movie', title='Batch Movie', release_year=2020,
+                             listed_in='Dramas', description='x', date_added=date.today())
+        Title.objects.create(show_id='b2', type='TV Show', title='Batch Show', release_year=2021,
+                             listed_in='Comedies', description='x')
+        self.url = reverse('api-batch')
+
+    def test_batch_matches_direct_calls(self):
+        """Every sub-response equals the response of calling the route directly"""
+        paths = ['/api/titles/recent/', '/api/titles/stats/', '/api/titles/movies/?page=1', '/api/titles/by-genre/Dramas/']
+        response = self.client.post(self.url, {'requests': paths}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for path, result in zip(paths, response.data['responses']):
+            direct = self.client.get(path)
+            self.assertEqual(result['path'], path)
+            self.assertEqual(result['status'], direct.status_code)
+            self.assertEqual(json.loads(json.dumps(result['body'])), direct.json())
+
+    def test_identical_requests_run_once(self):
+        """Repeated sub-requests are answered from one call"""
+        with mock.patch('website.batch._call', wraps=batch._call) as call:
+            response = self.client.post(self.url, {'requests': ['/api/titles/movies/', '/api/titles/movies/', '/api/titles/stats/']}, format='json')
+
+        self.assertEqual(call.call_count, 2)
+        self.assertEqual(response.data['responses'][0], response.data['responses'][1])
+
+    def test_only_read_routes_are_allowed(self):
+        """Unknown paths and write routes get an error entry; bad bodies are rejected"""
+        response = self.client.post(self.url, {'requests': ['/api/jobs/1/', '/nope/', '/api/titles/99999/']}, format='json')
+        self.assertEqual([result['status'] for result in response.data['responses']], [400, 404, 404])
+
+        self.assertEqual(self.client.post(self.url, {'requests': []}, format='json').status_code, 400)
+        too_many = {'requests': ['/api/titles/'] * 21}
+        self.assertEqual(self.client.post(self.url, too_many, format='json').status_code, 400)
+
+    def test_failing_sub_request_gets_500_entry(self):
+        """A sub-request that raises is reported as a 500 entry; the others still answer"""
+        caches['shared'].clear()
+        with mock.patch('website.views._compute_statistics', side_effect=RuntimeError('boom')), \
+                self.assertLogs('website.batch', 'ERROR'):
+            response = self.client.post(self.url, {'requests': ['/api/titles/stats/', '/api/titles/recent/']},
+                                        format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['status'] for result in response.data['responses']], [500, 200])
+
+
+class BatchConnectionTest(TransactionTestCase):
+    """Test that /api/batch/ sub-requests run one after another on the request's connection"""
+
+    def test_sub_requests_share_the_request_connection(self):
+        Title.objects.create(show_id='bt1', type='Movie', title='Serial', release_year=2020,
+                             listed_in='Dramas', description='x')
+        calls = []
+        original = batch._call
+
+        def record(*args):
+            calls.append((threading.current_thread(), id(connection.connection)))
+            return original(*args)
+
+        with mock.patch('website.batch._call', side_effect=record):
+            response = self.client.post(reverse('api-batch'), {'requests': ['/api/titles/', '/api/titles/movies/']},
+                                        content_type='application/json')
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[0], calls[1])
+        self.assertIs(calls[0][0], threading.current_thread())
+        self.assertEqual([result['body']['count'] for result in response.json()['responses']], [1, 1])
+
+
+class DuplicateDetectionTest(APITestCase):
+    """Test near-duplicate detection (find_duplicates and the create check)"""
+
+    def setUp(self):
+        # Blocks built by another test can share this test's change-feed sequence
+        block_index.clear()
+        self.original = Title.objects.create(show_id='d1', type='Movie', title='Love in a Puff', release_year=2010,
+                                             listed_in='Comedies', description='x')
+        Title.objects.create(show_id='d2', type='Movie', title='Love In A Puff!', release_year=2010,
+                             listed_in='Comedies', description='x')
+        Title.objects.create(show_id='d3', type='Movie', title='Love in a Puff', release_year=2012,
+                             listed_in='Comedies', description='x')  # Other block
+        Title.objects.create(show_id='d4', type='Movie', title='Something Else', release_year=2010,
+                             listed_in='Comedies', description='x')
+
+    def test_find_duplicates_command(self):
+        """Only similar titles in the same release_year/type block are reported"""
+        out = StringIO()
+        call_command('find_duplicates', stdout=out)
+        lines = out.getvalue().splitlines()
+
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('1.000  #'))
+        self.assertIn('d1 "Love in a Puff"', lines[0])
+        self.assertIn('d2 "Love In A Puff!"', lines[0])
+        self.assertIn('1 candidate pairs', lines[1])
+
+    def test_create_rejects_near_duplicate(self):
+        """POST /api/titles/ answers 409 for a near-duplicate unless allow_duplicate is set"""
+        data = {'show_id': 'd9', 'type': 'Movie', 'title': 'Love in a puff', 'release_year': 2010,
+                'listed_in': 'Comedies', 'description': 'Again'}
+        response = self.client.post(reverse('title-list-create'), data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual({match['show_id'] for match in response.data['duplicates']}, {'d1', 'd2'})
+
+        response = self.client.post(reverse('title-list-create') + '?allow_duplicate=true', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_block_index_follows_writes(self):
+        """The create check sees titles written after its block was built"""
+        self.assertEqual(block_index.similar('Brand New Film', 2010, 'Movie'), [])
+
+        Title.objects.create(show_id='d5', type='Movie', title='Brand New Film', release_year=2010,
+                             listed_in='Dramas', description='x')
+
+        self.assertEqual([match[1][1] for match in block_index.similar('Brand new film', 2010, 'Movie')], ['d5'])
+
+    def test_block_index_keeps_blocks_untouched_by_writes(self):
+        """A write only rebuilds the blocks its title left or joined"""
+        _, untouched = block_index.block(2010, 'Movie')
+        block_index.block(2012, 'Movie')
+        moved = Title.objects.get(show_id='d3')
+        moved.release_year = 2011
+        moved.save()
+
+        self.assertIs(block_index.block(2010, 'Movie')[1], untouched)
+        self.assertEqual(block_index.block(2012, 'Movie')[0], [])
+        self.assertEqual([show_id for _, show_id, _ in block_index.block(2011, 'Movie')[0]], ['d3'])
+
+    def test_block_index_follows_writes_from_other_processes(self):
+        """A write that only reached the database (no signals in this process) still rebuilds the block"""
+        self.assertEqual(block_index.similar('Brand New Film', 2010, 'Movie'), [])
+
+        with mock.patch('django.db.models.signals.post_save.send'):
+            title = Title.objects.create(show_id='d5', type='Movie', title='Brand New Film', release_year=2010,
+                                         listed_in='Dramas', description='x')
+        record_changes([(title.pk, title.show_id)])
+
+        self.assertEqual([match[1][1] for match in block_index.similar('Brand new film', 2010, 'Movie')], ['d5'])
+
+
+class ProfilingTest(APITestCase):
+    """Test the opt-in request memory profiler and /api/profiling/"""
+
+    def setUp(self):
+        # Stats cached by another test can share this test's catalog generation
+        caches['shared'].clear()
+        clear_profiles()
+        self.addCleanup(clear_profiles)
+        for i in range(3):
+            Title.objects.create(show_id=f'p{i}', type='Movie', title=f'Profiled {i}', release_year=2020,
+                                 listed_in='Dramas, Comedies', description='x')
+        self.staff = User.objects.create_user('staff', is_staff=True)
+
+    def test_staff_header_profiles_request(self):
+        """A staff X-Profile request records peak memory, instances, queries and hot spots"""
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('title-stats'), HTTP_X_PROFILE='1')
+
+        profile = recent_profiles()[0]
+        self.assertEqual(response['X-Profile-Id'], str(profile['id']))
+        self.assertEqual((profile['view'], profile['status'], profile['trigger']), ('title-stats', 200, 'header'))
+        self.assertGreater(profile['peak_kb'], 0)
+        self.assertEqual(profile['instances_by_model'], {'Title': 3})
+        self.assertGreater(profile['queries'], 0)
+        self.assertTrue(profile['hot_spots'])
+
+    @override_settings(DEBUG_PROPAGATE_EXCEPTIONS=True)
+    def test_profiler_released_when_view_raises(self):
+        """A view that raises still stops its profile and frees the profiler for the next request"""
+        self.client.force_login(self.staff)
+        with mock.patch('website.views._compute_statistics', side_effect=RuntimeError('boom')), \
+                self.assertRaises(RuntimeError):
+            self.client.get(reverse('title-stats'), HTTP_X_PROFILE='1')
+
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertTrue(profiling_lock.acquire(blocking=False))
+        profiling_lock.release()
+
+    def test_profiler_released_when_profile_fails_to_start(self):
+        """The profiler lock is given back if starting the profile raises"""
+        self.client.force_login(self.staff)
+        with mock.patch('website.middleware.RequestProfile.__enter__', side_effect=RuntimeError('boom')), \
+                self.assertRaises(RuntimeError):
+            self.client.get(reverse('title-stats'), HTTP_X_PROFILE='1')
+
+        self.assertIn('X-Profile-Id', self.client.get(reverse('title-stats'), HTTP_X_PROFILE='1'))
+
+    def test_header_ignored_for_anonymous_users(self):
+        """Non-staff requests are not profiled because of the header"""
+        response = self.client.get(reverse('title-stats'), HTTP_X_PROFILE='1')
+
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(recent_profiles(), [])
+
+    def test_sampling_fills_bounded_buffer(self):
+        """Sampled requests go into a ring buffer that keeps only the newest profiles"""
+        with override_settings(PROFILING_SAMPLE_RATE=1.0), \
+                mock.patch('website.profiling._profiles', deque(maxlen=2)):
+            for _ in range(3):
+                self.client.get(reverse('title-list-create'))
+            profiles = recent_profiles()
+
+        self.assertEqual(len(profiles), 2)
+        self.assertEqual(profiles[0]['trigger'], 'sample')
+        self.assertGreater(profiles[0]['id'], profiles[1]['id'])
+
+    def test_profiling_endpoint_is_staff_only(self):
+        """GET /api/profiling/ lists profiles with a per-view summary for staff"""
+        url = reverse('profiling')
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(self.staff)
+        self.client.get(reverse('title-list-create'), HTTP_X_PROFILE='1')
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['views']['title-list-create']['requests'], 1)
+        self.assertEqual(len(response.data['profiles']), 1)
+
+    def test_profile_endpoints_budget(self):
+        """profile_endpoints prints each request and fails when one exceeds the budget"""
+        out = StringIO()
+        call_command('profile_endpoints', '/api/titles/', stdout=out)
+        self.assertIn('/api/titles/', out.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command('profile_endpoints', '/api/titles/', max_peak_kb=0.001, stdout=StringIO())
+
+
+class TitleTimelineTest(APITestCase):
+    """Test the rollup-backed /api/titles/timeline/ endpoint"""
+
+    def setUp(self):
+        self.movie = Title.objects.create(
+            show_id='tl1', type='Movie', title='September Movie', date_added=date(2021, 9, 25),
+            release_year=2021, listed_in='Dramas, Comedies', description='x'
+        )
+        Title.objects.create(
+            show_id='tl2', type='TV Show', title='September Show', date_added=date(2021, 9, 2),
+            release_year=2021, listed_in='Comedies', description='x'
+        )
+        self.url = reverse('title-timeline')
+
+    def timeline(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {str(row['period']): row['count'] for row in response.data['results']}
+
+    def test_counts_by_month_type_and_genre(self):
+        """Test GET /api/titles/timeline/ with type and genre filters"""
+        self.assertEqual(self.timeline(granularity='month'), {'2021-09-01': 2})
+        self.assertEqual(self.timeline(granularity='month', type='Movie'), {'2021-09-01': 1})
+        self.assertEqual(self.timeline(granularity='year', genre='comedies'), {'2021-01-01': 2})
+        self.assertEqual(self.timeline(granularity='week', genre='Dramas'), {'2021-09-20': 1})
+
+    def test_rollups_follow_updates_and_deletes(self):
+        """Changing or deleting a title moves its counts"""
+        self.movie.date_added = date(2022, 1, 10)
+        self.movie.save()
+        self.assertEqual(self.timeline(granularity='year'), {'2021-01-01': 1, '2022-01-01': 1})
+
+        self.movie.delete()
+        self.assertEqual(self.timeline(granularity='year'), {'2021-01-01': 1})
+
+    def test_string_date_added_counts(self):
+        """A title created with date_added as a string lands in the right bucket"""
+        Title.objects.create(
+            show_id='tl3', type='Movie', title='January Movie', date_added='2021-01-05',
+            release_year=2021, listed_in='Dramas', description='x'
+        )
+        self.assertEqual(self.timeline(granularity='month'), {'2021-01-01': 1, '2021-09-01': 2})
+
+    def test_rebuild_matches_incremental_rollups(self):
+        """Rebuilding from scratch produces the same buckets as the write hooks"""
+        before = set(TitleAdditionRollup.objects.filter(count__gt=0).values_list('granularity', 'period', 'type', 'genre', 'count'))
+        rebuild_rollups()
+        after = set(TitleAdditionRollup.objects.values_list('granularity', 'period', 'type', 'genre', 'count'))
+        self.assertEqual(before, after)
+
+    def test_invalid_granularity(self):
+        """Test GET /api/titles/timeline/ with an unknown granularity"""
+        response = self.client.get(self.url, {'granularity': 'decade'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TitleListingReadModelTest(APITestCase):
+    """Test the TitleListing read model behind the list endpoints"""
+
+    def setUp(self):
+        self.title = Title.objects.create(
+            show_id='rm1', type='Movie', title='Read Model Movie', cast='Actor 1, Actor 2, Actor 3',
+            release_year=2020, duration='95 min', listed_in='Dramas, Thrillers', description='x'
+        )
+
+    def test_listing_created_with_derived_fields(self):
+        """Saving a title writes its listing with precomputed fields"""
+        listing = TitleListing.objects.get(title=self.title)
+
+        self.assertEqual(listing.genres, ['Dramas', 'Thrillers'])
+        self.assertEqual(listing.cast_count, 3)
+        self.assertEqual(listing.duration_minutes, 95)
+        self.assertEqual(listing.payload, dict(TitleListSerializer(self.title).data))
+
+    def test_list_serves_updated_listing(self):
+        """Updates reach the list endpoint and deletes remove the listing"""
+        self.title.title = 'Renamed Movie'
+        self.title.save()
+
+        response = self.client.get(reverse('title-list-create'))
+        self.assertEqual(response.data['results'][0]['title'], 'Renamed Movie')
+
+        self.title.delete()
+        self.assertFalse(TitleListing.objects.exists())
+
+    def test_list_does_not_read_title_table(self):
+        """GET /api/titles/ only queries the read model"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('title-list-create'))
+
+        self.assertFalse(any('"website_title"' in query['sql'] for query in queries.captured_queries))
+
+    def test_rebuild_read_models(self):
+        """rebuild_read_models recreates missing listings"""
+        TitleListing.objects.all().delete()
+
+        call_command('rebuild_read_models', stdout=StringIO())
+
+        self.assertEqual(TitleListing.objects.get().payload['show_id'], 'rm1')
+
+
+class TitleAdminTest(TestCase):
+    """Test the Title admin changelist, filters and bulk actions"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.admin)
+        self.movie = Title.objects.create(
+            show_id='ad1', type='Movie', title='Blood Moon', cast='Kirsten Dunst', release_year=2019, rating='PG'
+        )
+        self.show = Title.objects.create(
+            show_id='ad2', type='TV Show', title='Sea Breeze', director='Mia Hansen', release_year=2021, rating='TV-MA'
+        )
+        self.url = reverse('admin:website_title_changelist')
+
+    def test_facets_follow_writes(self):
+        """Facet counts track creates, updates and deletes"""
+        self.assertEqual(sorted(facet_values('type')), ['Movie', 'TV Show'])
+
+        self.show.type = 'Movie'
+        self.show.save()
+        self.assertEqual(facet_values('type'), ['Movie'])
+        self.assertEqual(TitleFacet.objects.get(field='type', value='Movie').count, 2)
+
+        self.movie.delete()
+        self.assertEqual(TitleFacet.objects.get(field='release_year', value='2019').count, 0)
+
+        TitleFacet.objects.all().delete()
+        rebuild_facets()
+        self.assertEqual(sorted(facet_values('rating')), ['TV-MA'])
+
+    def test_search_uses_full_text_index(self):
+        """Admin search matches word prefixes in any search column"""
+        response = self.client.get(self.url, {'q': 'kirst'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.movie])
+
+        self.movie.cast = 'Someone Else'
+        self.movie.save()
+        response = self.client.get(self.url, {'q': 'Mia Hans'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.show])
+        response = self.client.get(self.url, {'q': 'kirst'})
+        self.assertEqual(list(response.context['cl'].result_list), [])
+
+    def test_filters_come_from_facets(self):
+        """List filters are read from TitleFacet, not a DISTINCT over titles"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'rating': 'TV-MA'})
+
+        self.assertEqual(list(response.context['cl'].result_list), [self.show])
+        self.assertFalse(any('DISTINCT' in query['sql'] for query in queries.captured_queries))
+
+    def test_delete_in_batches_asks_for_confirmation(self):
+        """The batched delete action shows a confirmation page before deleting anything"""
+        response = self.client.post(self.url, {
+            'action': 'delete_in_batches',
+            '_selected_action': [self.movie.pk, self.show.pk],
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['count'], 2)
+        self.assertContains(response, 'name="post" value="yes"')
+        self.assertEqual(Title.objects.count(), 2)
+
+    def test_delete_in_batches(self):
+        """The confirmed batched delete removes titles and their derived rows"""
+        with mock.patch('website.admin.ADMIN_BATCH_SIZE', 1):
+            self.client.post(self.url, {
+                'action': 'delete_in_batches',
+                '_selected_action': [self.movie.pk, self.show.pk],
+                'post': 'yes',
+            })
+
+        self.assertFalse(Title.objects.exists())
+        self.assertFalse(TitleListing.objects.exists())
+        self.assertEqual(TitleChange.objects.filter(deleted=True).count(), 2)
+
+    def test_mark_as_tv_show(self):
+        """Bulk type changes go through the write hooks"""
+        self.client.post(self.url, {'action': 'mark_as_tv_show', '_selected_action': [self.movie.pk]})
+
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.type, 'TV Show')
+        self.assertEqual(TitleListing.objects.get(title=self.movie).type, 'TV Show')
+        self.assertEqual(facet_values('type'), ['TV Show'])
+
+
+class TitleChangeFeedTest(APITestCase):
+    """Test the /api/titles/changes/ delta-sync feed"""
+
+    def setUp(self):
+        self.url = reverse('title-changes')
+        self.first = Title.objects.create(show_id='cf1', type='Movie', title='First',
+                                          release_year=2020, listed_in='Dramas', description='x')
+        self.second = Title.objects.create(show_id='cf2', type='Movie', title='Second',
+                                           release_year=2020, listed_in='Dramas', description='x')
+
+    def sync(self, since=0, **params):
+        response = self.client.get(self.url, {'since': since, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_since_zero_returns_everything(self):
+        """A fresh client gets every title as an upsert"""
+        data = self.sync()
+
+        self.assertEqual([c['title']['show_id'] for c in data['changes']], ['cf1', 'cf2'])
+        self.assertFalse(data['has_more'])
+
+    def test_only_changes_after_token(self):
+        """Updates and deletes after the token come back, with a tombstone for the delete"""
+        token = self.sync()['next']
+
+        second_pk = self.second.pk
+        self.first.title = 'First, Renamed'
+        self.first.save()
+        self.second.delete()
+        data = self.sync(token)
+
+        self.assertEqual(data['changes'][0]['op'], 'upsert')
+        self.assertEqual(data['changes'][0]['title']['title'], 'First, Renamed')
+        self.assertEqual(data['changes'][1], {'op': 'delete', 'seq': data['changes'][1]['seq'],
+                                              'id': second_pk, 'show_id': 'cf2'})
+        self.assertEqual(self.sync(data['next'])['changes'], [])
+
+    def test_paging_with_limit(self):
+        """has_more and next let a client page through the feed"""
+        data = self.sync(limit=1)
+        self.assertTrue(data['has_more'])
+
+        data = self.sync(data['next'], limit=1)
+        self.assertEqual(data['changes'][0]['title']['show_id'], 'cf2')
+
+    def test_missing_listings_served_from_titles(self):
+        """Titles whose listing was never built still come back as upserts"""
+        TitleListing.objects.all().delete()
+        data = self.sync()
+
+        self.assertEqual([c['title'] for c in data['changes']],
+                         [TitleListSerializer(title).data for title in [self.first, self.second]])
+        self.assertFalse(data['has_more'])
+
+    def test_invalid_limit_reported_under_limit(self):
+        """A bad ?limit= is reported under limit, not since"""
+        for limit in ('abc', '0'):
+            response = self.client.get(self.url, {'since': 0, 'limit': limit})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(list(response.data), ['limit'])
+
+    def test_compaction_keeps_newest_entry_per_title(self):
+        """compact_changes drops superseded entries without changing what clients receive"""
+        for name in ['A', 'B', 'C']:
+            self.first.title = name
+            self.first.save()
+        before = self.sync()['changes']
+
+        call_command('compact_changes', stdout=StringIO())
+
+        self.assertEqual(TitleChange.objects.count(), 2)
+        self.assertEqual(self.sync()['changes'], sorted(before, key=lambda c: c['seq']))
+
+
+class CatalogSnapshotTest(APITestCase):
+    """Test the prebuilt catalog snapshot and its manifest endpoint"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        static_root = override_settings(STATIC_ROOT=self.tmpdir.name)
+        static_root.enable()
+        self.addCleanup(static_root.disable)
+        Title.objects.create(show_id='snap1', type='Movie', title='Snapshot Movie',
+                             release_year=2020, listed_in='Dramas', description='x')
+
+    def test_manifest_404_before_first_build(self):
+        """Test GET /api/catalog/manifest/ before any snapshot exists"""
+        response = self.client.get(reverse('catalog-manifest'))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_snapshot_served_precompressed_and_immutable(self):
+        """The manifest points at a versioned file WhiteNoise serves compressed with immutable caching"""
+        call_command('build_catalog_snapshot', stdout=StringIO())
+
+        manifest = self.client.get(reverse('catalog-manifest')).data
+        self.assertEqual(manifest['version'], TitleChange.objects.latest('seq').seq)
+
+        response = self.client.get(manifest['url'], HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+
+        body = json.loads(gzip.decompress(b''.join(response.streaming_content)))
+        self.assertEqual([t['show_id'] for t in body['titles']], ['snap1'])
+
+    def test_removed_snapshot_is_404(self):
+        """A snapshot dropped by a later build is a 404, not a 500, even after it was served"""
+        call_command('build_catalog_snapshot', stdout=StringIO())
+        old_url = self.client.get(reverse('catalog-manifest')).data['url']
+        self.assertEqual(self.client.get(old_url).status_code, status.HTTP_200_OK)
+
+        for i in range(3):
+            Title.objects.create(show_id=f'snap-new{i}', type='Movie', title=f'Newer {i}',
+                                 release_year=2021, listed_in='Dramas', description='x')
+            call_command('build_catalog_snapshot', stdout=StringIO())
+
+        self.assertEqual(self.client.get(old_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual([name for name in os.listdir(os.path.join(self.tmpdir.name, 'snapshots'))
+                          if name.endswith('.tmp')], [])
+
+
+    def test_writes_queue_one_debounced_build(self):
+        """Committed writes queue a single snapshot job for the worker, due when the window ends"""
+        with self.captureOnCommitCallbacks(execute=True):
+            Title.objects.create(show_id='snap2', type='Movie', title='Second', release_year=2020, description='x')
+        with self.captureOnCommitCallbacks(execute=True):
+            Title.objects.create(show_id='snap3', type='Movie', title='Third', release_year=2020, description='x')
+
+        job = Job.objects.get(kind='build_catalog_snapshot')
+        self.assertGreater(job.run_after, job.created_at)
+        self.assertIsNone(claim_next('test'))
+        self.assertIsNone(read_manifest())
+
+        Job.objects.update(run_after=job.created_at)
+        run_job(claim_next('test'))
+        self.assertEqual(read_manifest()['version'], TitleChange.objects.latest('seq').seq)
+
+
+class DatabaseSnapshotTest(TransactionTestCase):
+    """Test the snapshot and restore commands (with committed data: the backup API takes its own read lock)"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        output_dirs = override_settings(STATIC_ROOT=self.path('static'), PEOPLE_GRAPH_DIR=self.path('graph'))
+        output_dirs.enable()
+        self.addCleanup(output_dirs.disable)
+        self.kept = Title.objects.create(show_id='db1', type='Movie', title='Kept', date_added=date(2021, 1, 5),
+                                         release_year=2020, listed_in='Dramas', description='x')
+        self.dropped = Title.objects.create(show_id='db2', type='Movie', title='Dropped',
+                                            release_year=2020, listed_in='Dramas', description='x')
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def test_snapshot_copies_database(self):
+        """snapshot writes a SQLite file containing the titles"""
+        call_command('snapshot', output=self.path('db.sqlite3'), stdout=StringIO())
+
+        copy = sqlite3.connect(self.path('db.sqlite3'))
+        self.addCleanup(copy.close)
+        self.assertEqual(copy.execute('SELECT COUNT(*) FROM website_title').fetchone()[0], 2)
+
+    def test_parquet_round_trip(self):
+        """restore --parquet replaces titles and brings the derived tables along"""
+        call_command('snapshot', output=self.path('db.sqlite3'), parquet=self.path('titles.parquet'), stdout=StringIO())
+        Title.objects.filter(pk=self.kept.pk).update(title='Changed')
+        dropped_pk = self.dropped.pk
+        Title.objects.filter(pk=dropped_pk).delete()
+        Title.objects.create(show_id='db3', type='Movie', title='Added later',
+                             release_year=2020, listed_in='Dramas', description='x')
+
+        call_command('restore', parquet=self.path('titles.parquet'), interactive=False, stdout=StringIO())
+
+        self.assertEqual(sorted(Title.objects.values_list('show_id', flat=True)), ['db1', 'db2'])
+        self.assertEqual(Title.objects.get(show_id='db1').date_added, date(2021, 1, 5))
+        self.assertEqual(TitleListing.objects.get(pk=self.kept.pk).payload['title'], 'Kept')
+        self.assertTrue(TitleChange.objects.filter(show_id='db3', deleted=True).exists())
+        self.assertTrue(TitleChange.objects.filter(title_id=dropped_pk, deleted=False).exists())
+        self.assertEqual(read_manifest()['version'], TitleChange.objects.latest('seq').seq)
+        self.assertEqual(sorted(get_graph().title_ids), sorted(Title.objects.values_list('pk', flat=True)))
+
+    def test_restore_from_file_moves_feed_forward(self):
+        """restore --from keeps the change feed moving forward, so newer tokens still see the restore"""
+        call_command('snapshot', output=self.path('db.sqlite3'), stdout=StringIO())
+        Title.objects.create(show_id='db3', type='Movie', title='Added later',
+                             release_year=2020, listed_in='Dramas', description='x')
+        token = TitleChange.objects.latest('seq').seq
+
+        call_command('restore', source=self.path('db.sqlite3'), interactive=False, stdout=StringIO())
+
+        self.assertEqual(sorted(Title.objects.values_list('show_id', flat=True)), ['db1', 'db2'])
+        changes = self.client.get(reverse('title-changes'), {'since': token}).json()['changes']
+        self.assertEqual(sorted((c['op'], c.get('show_id') or c['title']['show_id']) for c in changes),
+                         [('delete', 'db3'), ('upsert', 'db1'), ('upsert', 'db2')])
+        self.assertEqual(read_manifest()['version'], TitleChange.objects.latest('seq').seq)
+
+
+class PeopleGraphTest(APITestCase):
+    """Test the cast/crew collaboration graph endpoints"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        graph_dir = override_settings(PEOPLE_GRAPH_DIR=self.tmpdir.name)
+        graph_dir.enable()
+        self.addCleanup(graph_dir.disable)
+
+        def make(show_id, director, cast):
+            return Title.objects.create(show_id=show_id, type='Movie', title=f'Film {show_id}', director=director,
+                                        cast=cast, release_year=2020, listed_in='Dramas', description='x')
+        self.film1 = make('g1', 'Dana Director', 'Alice, Bob')
+        self.film2 = make('g2', None, 'Bob, Carol')
+        self.film3 = make('g3', None, 'Carol, Dave')
+        make('g4', 'Dana Director', 'Alice')
+
+    def build(self):
+        call_command('build_people_graph', stdout=StringIO())
+
+    def test_rebuild_keeps_previous_version(self):
+        """A rebuild keeps the version it replaced and leaves directories it did not write alone"""
+        os.makedirs(os.path.join(self.tmpdir.name, 'unrelated'))
+        self.build()
+        first = published_version()
+        self.build()
+        second = published_version()
+        self.build()
+
+        entries = os.listdir(self.tmpdir.name)
+        self.assertIn(second, entries)
+        self.assertIn(published_version(), entries)
+        self.assertIn('unrelated', entries)
+        self.assertNotIn(first, entries)
+
+    def test_503_before_graph_is_built(self):
+        """Graph endpoints explain that the graph is missing"""
+        response = self.client.get(reverse('person-titles', kwargs={'name': 'Alice'}))
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_filmography(self):
+        """Test GET /api/people/{name}/titles/ with roles"""
+        self.build()
+        response = self.client.get(reverse('person-titles', kwargs={'name': 'dana director'}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'Dana Director')
+        self.assertEqual([(r['role'], r['title']['show_id']) for r in response.data['results']],
+                         [('director', 'g1'), ('director', 'g4')])
+
+    def test_top_collaborators(self):
+        """Test GET /api/people/{name}/collaborators/ ranks by shared titles"""
+        self.build()
+        response = self.client.get(reverse('person-collaborators', kwargs={'name': 'Alice'}))
+
+        self.assertEqual(response.data['results'], [
+            {'name': 'Dana Director', 'shared_titles': 2},
+            {'name': 'Bob', 'shared_titles': 1},
+        ])
+
+    def test_shortest_path(self):
+        """Test GET /api/people/path/ walks shared titles"""
+        self.build()
+        response = self.client.get(reverse('people-path'), {'from': 'Alice', 'to': 'Dave'})
+
+        self.assertEqual(response.data['degrees'], 3)
+        self.assertEqual([step['person'] for step in response.data['path']], ['Alice', 'Bob', 'Carol', 'Dave'])
+        self.assertEqual(response.data['path'][1]['via']['id'], self.film1.pk)
+        self.assertEqual(response.data['path'][3]['via']['id'], self.film3.pk)
+
+    def test_unknown_person_404(self):
+        """Unknown names are a 404"""
+        self.build()
+        response = self.client.get(reverse('person-collaborators', kwargs={'name': 'Nobody'}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,13 @@
+from rest_framework.throttling import UserRateThrottle
+
+
+class StatsRateThrottle(UserRateThrottle):
+    """Per-client limit for /api/titles/stats/ (by user, or by IP when anonymous)"""
+
+    scope = 'stats'
+
+
+class GenreRateThrottle(UserRateThrottle):
+    """Per-client limit for the genre scan in /api/titles/by-genre/<genre>/"""
+
+    scope = 'genre'
@@ -16,6 +16,7 @@ urlpatterns = [
     #Main REStful API, retrieves the title and uses <int:pk> to show  the db id as a number
     path('api/titles/', views.TitleListCreateView.as_view(), name='title-list-create'),
     path('api/titles/<int:pk>/', views.TitleDetailView.as_view(), name='title-detail'),
+    path('api/titles/batch/', views.title_batch, name='title-batch'), # Several titles by id in one query, ?ids=1,2,3
     
     path('api/titles/movies/', views.MovieListView.as_view(), name='movie-list'), # Filter by movies
     path('api/titles/tv-shows/', views.TVShowListView.as_view(), name='tv-show-list'),# Filter by TV Shows
@@ -24,5 +25,21 @@ urlpatterns = [
     
     # Additional useful endpoints
     path('api/titles/recent/', views.recent_titles, name='recent-titles'), # Display any titles added
+    path('api/titles/changes/', views.title_changes, name='title-changes'), # Delta sync for mobile, ?since=<token>
     path('api/titles/stats/', views.title_statistics, name='title-stats'), # Stats of the whole DB
+    path('api/catalog/manifest/', views.catalog_manifest, name='catalog-manifest'), # Where to download the catalog snapshot
+    path('api/titles/timeline/', views.title_timeline, name='title-timeline'), # Titles added per week/month/year, ?granularity=&type=&genre=
+
+    path('api/batch/', views.api_batch, name='api-batch'), # Several read-only calls in one round trip, POST {"requests": [...]}
+
+    # Background imports and rebuilds, run by: python manage.py run_jobs
+    path('api/jobs/', views.job_create, name='job-create'), # POST {"kind": ..., "params": {...}}, staff only
+    path('api/jobs/<int:pk>/', views.job_detail, name='job-detail'), # Progress, rows/s and ETA
+
+    path('api/profiling/', views.profiling_results, name='profiling'), # Request memory profiles, staff only
+
+    # Cast/crew collaboration graph (build with: python manage.py build_people_graph)
+    path('api/people/path/', views.collaboration_path, name='people-path'), # ?from=<name>&to=<name>
+    path('api/people/<str:name>/titles/', views.person_titles, name='person-titles'),
+    path('api/people/<str:name>/collaborators/', views.person_collaborators, name='person-collaborators'),
 ]
\ No newline at end of file
@@ -1,13 +1,28 @@
 from django.shortcuts import render
+from django.conf import settings
 from django.http import HttpResponse
-from django.db.models import Q, Count, Avg, Min, Max
+from django.db import transaction
+from django.db.models import F, Q, Count, Avg, Min, Max
+from django.utils.http import parse_etags
 from rest_framework import generics, status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.http import Http404
 from datetime import datetime
-from .models import Title
-from .serializers import TitleSerializer, TitleListSerializer, TitleCreateSerializer, TitleDetailSerializer
+import hashlib
+from .models import Title, TitleAdditionRollup, TitleListing, Job
+from .cache import get_title_detail, get_title_details, catalog_generation, single_flight
+from .throttles import StatsRateThrottle, GenreRateThrottle
+from .changes import changes_since
+from .snapshots import read_manifest
+from .graph import get_graph, GraphNotBuilt
+from .jobs import enqueue
+from .batch import run_batch
+from .duplicates import block_index
+from .profiling import recent_profiles, clear_profiles, summarize
+from .serializers import TitleSerializer, TitleCreateSerializer, TitleDetailSerializer, TitleListingSerializer, JobSerializer, JobCreateSerializer
 
 def home(request):
     # Simple HTML PAge to display everything
@@ -17,14 +32,25 @@ def home(request):
     <h1>Netflix Titles REST API</h1>
     <h2>Available Endpoints:</h2>
     <ul>
-        <li><a href="/api/titles/">/api/titles/</a> - List all titles (GET) and create new title (POST)</li>
+        <li><a href="/api/titles/">/api/titles/</a> - List all titles (GET) and create new title (POST, ?allow_duplicate=true to skip the near-duplicate check)</li>
         <li><a href="/api/titles/1/">/api/titles/{id}/</a> - Get, update, or delete specific title</li>
+        <li><a href="/api/titles/batch/?ids=1,2,3">/api/titles/batch/?ids={id},{id}</a> - Get several titles in one call</li>
         <li><a href="/api/titles/movies/">/api/titles/movies/</a> - List all movies only</li>
         <li><a href="/api/titles/tv-shows/">/api/titles/tv-shows/</a> - List all TV shows only</li>
         <li><a href="/api/titles/by-year/2020/">/api/titles/by-year/{year}/</a> - Titles by release year</li>
         <li><a href="/api/titles/by-genre/Drama/">/api/titles/by-genre/{genre}/</a> - Titles by genre</li>
         <li><a href="/api/titles/recent/">/api/titles/recent/</a> - Recently added titles</li>
+        <li><a href="/api/titles/changes/?since=0">/api/titles/changes/?since={token}</a> - Titles changed since a sync token</li>
+        <li><a href="/api/catalog/manifest/">/api/catalog/manifest/</a> - Current prebuilt catalog snapshot</li>
+        <li><a href="/api/people/Kirsten Johnson/titles/">/api/people/{name}/titles/</a> - Filmography of a director or cast member</li>
+        <li><a href="/api/people/Kirsten Johnson/collaborators/">/api/people/{name}/collaborators/</a> - Who a person worked with most</li>
+        <li><a href="/api/people/path/?from=Kevin Bacon&to=Tom Hanks">/api/people/path/?from=&to=</a> - Shortest collaboration path between two people</li>
         <li><a href="/api/titles/stats/">/api/titles/stats/</a> - Statistics about the dataset</li>
+        <li>/api/batch/ - Run several GET calls in one request (POST {"requests": [paths]})</li>
+        <li>/api/jobs/ - Queue an import or rebuild (POST, staff only)</li>
+        <li>/api/jobs/{id}/ - Progress of a background job (staff only)</li>
+        <li>/api/profiling/ - Memory profiles of requests sent with an X-Profile header or sampled (staff only)</li>
+        <li><a href="/api/titles/timeline/?granularity=month">/api/titles/timeline/?granularity={week|month|year}&type=&genre=</a> - Titles added over time</li>
     </ul>
     <h3>Technical Information:</h3>
     <p><strong>Python Version:</strong> 3.13</p>
@@ -53,14 +79,47 @@ def home(request):
 
 # API Views
 
+def listings():
+    """List endpoints read the slim TitleListing read model and return its pre-rendered payloads"""
+    return TitleListing.objects.only('payload')
+
 class TitleListCreateView(generics.ListCreateAPIView):
     """API endpoint 1: List all titles (GET) and create new title (POST)"""
-    queryset = Title.objects.all()
+    
+    def get_queryset(self):
+        return listings()
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return TitleCreateSerializer
-        return TitleListSerializer
+        return TitleListingSerializer
+
+    def create(self, request, *args, **kwargs):
+        # Near-duplicates of an existing title (same year and type, similar name)
+        # are refused with 409 unless the client passes ?allow_duplicate=true
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if request.query_params.get('allow_duplicate', '').lower() not in ('1', 'true', 'yes'):
+            data = serializer.validated_data
+            matches = block_index.similar(data['title'], data['release_year'], data['type'])
+            if matches:
+                return Response({
+                    'detail': 'This looks like a title that already exists; add ?allow_duplicate=true to create it anyway.',
+                    'duplicates': [
+                        {'id': pk, 'show_id': show_id, 'title': title, 'score': round(score, 3)}
+                        for score, (pk, show_id, title) in matches
+                    ],
+                }, status=status.HTTP_409_CONFLICT)
+
+        self.perform_create(serializer)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=self.get_success_headers(serializer.data))
+
+def title_etag(version):
+    return f'"{version}"'
+
+def _etag_matches(header, etag):
+    etags = parse_etags(header)
+    return '*' in etags or etag in etags
 
 class TitleDetailView(generics.RetrieveUpdateDestroyAPIView):
     """API endpoint 2: Get, update, or delete a specific title by ID"""
@@ -68,52 +127,341 @@ class TitleDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Title.objects.all()
     serializer_class = TitleDetailSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        # Served from the per-pk detail cache; writes invalidate it through signals
+        payload = get_title_detail(self.kwargs['pk'])
+        if payload is None:
+            raise Http404
+        etag = title_etag(payload['version'])
+        if _etag_matches(request.headers.get('If-None-Match', ''), etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return Response(payload, headers={'ETag': etag})
+
+    def update(self, request, *args, **kwargs):
+        """
+        PUT/PATCH that writes only the columns whose value changes.
+
+        If-Match with the ETag from a GET makes the write conditional (412 if
+        the title changed since). A write that changes nothing does not touch
+        the database, so caches and derived tables stay as they are.
+        """
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        if_match = request.headers.get('If-Match')
+        if if_match is not None and not _etag_matches(if_match, title_etag(instance.version)):
+            return self._precondition_failed(instance.version)
+
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        changes = {
+            name: value for name, value in serializer.validated_data.items()
+            if getattr(instance, name) != value
+        }
+        if changes:
+            with transaction.atomic():
+                # Claim the next version; fails if another write got there first
+                claimed = Title.objects.filter(pk=instance.pk, version=instance.version).update(version=F('version') + 1)
+                if not claimed:
+                    return self._precondition_failed(Title.objects.get(pk=instance.pk).version)
+                for name, value in changes.items():
+                    setattr(instance, name, value)
+                instance.version += 1
+                instance.save(update_fields=list(changes), bump_version=False)
+
+        return Response(self.get_serializer(instance).data, headers={'ETag': title_etag(instance.version)})
+
+    def _precondition_failed(self, version):
+        return Response(
+            {'detail': 'The title was changed by someone else; fetch it again and retry.', 'version': version},
+            status=status.HTTP_412_PRECONDITION_FAILED,
+            headers={'ETag': title_etag(version)},
+        )
+
 class MovieListView(generics.ListAPIView):
     """API endpoint 3: List all movies only"""
     
-    serializer_class = TitleListSerializer
+    serializer_class = TitleListingSerializer
     
     def get_queryset(self):
-        return Title.objects.filter(type='Movie')
+        return listings().filter(type='Movie')
 
 class TVShowListView(generics.ListAPIView):
     """API endpoint 4: List all TV shows only"""
-    serializer_class = TitleListSerializer
+    serializer_class = TitleListingSerializer
     
     def get_queryset(self):
-        return Title.objects.filter(type='TV Show')
+        return listings().filter(type='TV Show')
 
 class TitlesByYearView(generics.ListAPIView):
     """API endpoint 5: Get titles by release year"""
-    serializer_class = TitleListSerializer
+    serializer_class = TitleListingSerializer
     
     def get_queryset(self):
         year = self.kwargs.get('year')
-        return Title.objects.filter(release_year=year)
+        return listings().filter(release_year=year)
 
 class TitlesByGenreView(generics.ListAPIView):
     """API endpoint 6: Get titles by genre (case-insensitive search in listed_in field)"""
-    serializer_class = TitleListSerializer
+    serializer_class = TitleListingSerializer
+    throttle_classes = [GenreRateThrottle]
     
     def get_queryset(self):
         genre = self.kwargs.get('genre')
-        return Title.objects.filter(listed_in__icontains=genre)
+        return listings().filter(listed_in__icontains=genre)
+
+    def list(self, request, *args, **kwargs):
+        # Identical page requests share one scan (see single_flight)
+        url = request.build_absolute_uri()
+        key = f"titles-by-genre:{catalog_generation()}:{hashlib.md5(url.encode()).hexdigest()}"
+        data = single_flight(key, lambda: super(TitlesByGenreView, self).list(request, *args, **kwargs).data)
+        return Response(data)
+
+MAX_BATCH_IDS = 100
+
+@api_view(['GET'])
+def title_batch(request):
+    """Get several titles by ID in one call: /api/titles/batch/?ids=1,2,3"""
+    raw_ids = request.query_params.get('ids', '')
+    try:
+        ids = [int(value) for value in raw_ids.split(',') if value.strip()]
+    except ValueError:
+        return Response({'ids': 'Must be a comma-separated list of integer IDs.'}, status=status.HTTP_400_BAD_REQUEST)
+    if not ids:
+        return Response({'ids': 'At least one ID is required.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(ids) > MAX_BATCH_IDS:
+        return Response({'ids': f'At most {MAX_BATCH_IDS} IDs per request.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    ids = list(dict.fromkeys(ids))  # drop repeats, keep order
+    payloads = get_title_details(ids)
+    return Response({
+        'results': [payloads[pk] for pk in ids if pk in payloads],
+        'missing': [pk for pk in ids if pk not in payloads],
+    })
+
+MAX_CHANGES_PAGE = 1000
+
+@api_view(['GET'])
+def title_changes(request):
+    """Delta sync: titles created, updated or deleted after the ?since= token"""
+    try:
+        since = int(request.query_params.get('since', 0))
+    except ValueError:
+        since = -1
+    if since < 0:
+        return Response({'since': 'Must be a token returned by a previous call.'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = min(int(request.query_params.get('limit', MAX_CHANGES_PAGE)), MAX_CHANGES_PAGE)
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        return Response({'limit': f'Must be a whole number between 1 and {MAX_CHANGES_PAGE}.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    changes, next_seq, has_more = changes_since(since, limit)
+    return Response({
+        'changes': changes,
+        'next': str(next_seq),
+        'has_more': has_more,
+    })
+
+@api_view(['GET'])
+def catalog_manifest(request):
+    """Points clients at the current prebuilt catalog snapshot (served as a static file)"""
+    manifest = read_manifest()
+    if manifest is None:
+        return Response({'detail': 'No catalog snapshot has been built yet.'}, status=status.HTTP_404_NOT_FOUND)
+    manifest['url'] = request.build_absolute_uri(manifest['url'])
+    manifest['changes_url'] = request.build_absolute_uri(f"/api/titles/changes/?since={manifest['version']}")
+    return Response(manifest, headers={'Cache-Control': 'no-cache'})
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def job_create(request):
+    """Queue an import or rebuild for the run_jobs worker; an identical job already queued or running is returned instead"""
+    serializer = JobCreateSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    job, created = enqueue(serializer.validated_data['kind'], serializer.validated_data['params'])
+    return Response(
+        JobSerializer(job).data,
+        status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        headers={'Location': f'/api/jobs/{job.pk}/'},
+    )
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def job_detail(request, pk):
+    """Progress, rows per second and ETA of a background job"""
+    try:
+        job = Job.objects.get(pk=pk)
+    except Job.DoesNotExist:
+        raise Http404(f'No job with id {pk}')
+    return Response(JobSerializer(job).data, headers={'Cache-Control': 'no-cache'})
+
+@api_view(['POST'])
+def api_batch(request):
+    """Several read-only API calls in one round trip: POST {"requests": ["/api/titles/recent/", "/api/titles/stats/"]}"""
+    urls = request.data.get('requests') if isinstance(request.data, dict) else None
+    if not isinstance(urls, list) or not urls or not all(isinstance(url, str) for url in urls):
+        return Response({'requests': 'Must be a non-empty list of API paths.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(urls) > settings.API_BATCH_MAX_REQUESTS:
+        return Response({'requests': f'At most {settings.API_BATCH_MAX_REQUESTS} requests per batch.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = run_batch(request._request, urls)
+    return Response({
+        'responses': [
+            {'path': url, 'status': code, 'body': body}
+            for url, (code, body) in zip(urls, results)
+        ],
+    })
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+def profiling_results(request):
+    """Recent request memory profiles (newest first) and a per-view summary; DELETE clears them"""
+    if request.method == 'DELETE':
+        clear_profiles()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    profiles = recent_profiles()
+    view = request.query_params.get('view')
+    if view:
+        profiles = [profile for profile in profiles if profile['view'] == view]
+    return Response({'views': summarize(profiles), 'profiles': profiles})
+
+def _people_graph():
+    try:
+        return get_graph(), None
+    except GraphNotBuilt as exc:
+        return None, Response({'detail': str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+def _person_or_404(graph, name):
+    person = graph.person_id(name)
+    if person is None:
+        raise Http404(f"No person named '{name}'")
+    return person
+
+@api_view(['GET'])
+def person_titles(request, name):
+    """Filmography of a director or cast member, from the people graph"""
+    graph, error = _people_graph()
+    if error:
+        return error
+    person = _person_or_404(graph, name)
+
+    credits = graph.filmography(person)
+    payloads = dict(TitleListing.objects.filter(pk__in=[pk for pk, _ in credits]).values_list('pk', 'payload'))
+    return Response({
+        'name': graph.names[person],
+        'results': [{'role': role, 'title': payloads[pk]} for pk, role in credits if pk in payloads],
+    })
+
+@api_view(['GET'])
+def person_collaborators(request, name):
+    """People who worked with a person most often, with the number of shared titles"""
+    graph, error = _people_graph()
+    if error:
+        return error
+    person = _person_or_404(graph, name)
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), 100)
+    except ValueError:
+        return Response({'limit': 'Must be a number.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'name': graph.names[person],
+        'results': [
+            {'name': graph.names[other], 'shared_titles': count}
+            for other, count in graph.collaborators(person, limit)
+        ],
+    })
+
+@api_view(['GET'])
+def collaboration_path(request):
+    """Shortest chain of shared titles between two people: /api/people/path/?from=&to="""
+    graph, error = _people_graph()
+    if error:
+        return error
+    names = [request.query_params.get('from', ''), request.query_params.get('to', '')]
+    if not all(names):
+        return Response({'detail': "Both 'from' and 'to' are required."}, status=status.HTTP_400_BAD_REQUEST)
+    source, target = (_person_or_404(graph, name) for name in names)
+
+    path = graph.shortest_path(source, target)
+    if path is None:
+        return Response({'from': graph.names[source], 'to': graph.names[target], 'degrees': None, 'path': []})
+
+    # path alternates person, title index, person, ...
+    title_pks = [int(graph.title_ids[index]) for index in path[1::2]]
+    titles = dict(Title.objects.filter(pk__in=title_pks).values_list('pk', 'title'))
+    steps = [{'person': graph.names[person]} for person in path[0::2]]
+    for step, pk in zip(steps[1:], title_pks):
+        step['via'] = {'id': pk, 'title': titles.get(pk)}
+    return Response({
+        'from': graph.names[source],
+        'to': graph.names[target],
+        'degrees': len(title_pks),
+        'path': steps,
+    })
+
+# Titles go back to the 1920s; a larger window only risks date overflow
+MAX_RECENT_DAYS = 36500
 
 @api_view(['GET'])
 def recent_titles(request):
-    """Bonus endpoint: Get recently added titles (last 30 days from date_added)"""
+    """Bonus endpoint: Get recently added titles (last 30 days from date_added, or ?days=)"""
     from datetime import datetime, timedelta
-    thirty_days_ago = datetime.now().date() - timedelta(days=30)
-    titles = Title.objects.filter(
-        date_added__gte=thirty_days_ago
+    try:
+        days = int(request.query_params.get('days', 30))
+    except ValueError:
+        days = None
+    if days is None or not 0 <= days <= MAX_RECENT_DAYS:
+        return Response(
+            {'days': f'Must be a whole number of days between 0 and {MAX_RECENT_DAYS}.'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    since = datetime.now().date() - timedelta(days=days)
+    titles = listings().filter(
+        date_added__gte=since
     ).order_by('-date_added')[:20]
     
-    serializer = TitleListSerializer(titles, many=True)
+    serializer = TitleListingSerializer(titles, many=True)
     return Response(serializer.data)
 
 @api_view(['GET'])
+def title_timeline(request):
+    """Titles added per week, month or year, optionally for one type and/or genre (served from rollups)"""
+    granularity = request.query_params.get('granularity', 'month')
+    title_type = request.query_params.get('type', '')
+    genre = request.query_params.get('genre', '')
+
+    if granularity not in TitleAdditionRollup.GRANULARITIES:
+        return Response(
+            {'granularity': f"Must be one of: {', '.join(TitleAdditionRollup.GRANULARITIES)}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if title_type not in ('', 'Movie', 'TV Show'):
+        return Response({'type': "Type must be either 'Movie' or 'TV Show'"}, status=status.HTTP_400_BAD_REQUEST)
+
+    rollups = TitleAdditionRollup.objects.filter(granularity=granularity, type=title_type, count__gt=0)
+    rollups = rollups.filter(genre__iexact=genre) if genre else rollups.filter(genre='')
+
+    return Response({
+        'granularity': granularity,
+        'type': title_type or None,
+        'genre': genre or None,
+        'results': [
+            {'period': period, 'count': count}
+            for period, count in rollups.order_by('period').values_list('period', 'count')
+        ],
+    })
+
+@api_view(['GET'])
+@throttle_classes([StatsRateThrottle])
 def title_statistics(request):
     """Bonus endpoint: Get statistics about the dataset"""
+    stats = single_flight(f'title-stats:{catalog_generation()}', _compute_statistics)
+    return Response(stats)
+
+def _compute_statistics():
+    """Scan the catalog and build the payload for title_statistics"""
     total_titles = Title.objects.count()
     movies_count = Title.objects.filter(type='Movie').count()
     tv_shows_count = Title.objects.filter(type='TV Show').count()
@@ -146,4 +494,4 @@ def title_statistics(request):
         'top_genres': dict(top_genres),
     }
     
-    return Response(stats)
+    return stats